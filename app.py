@@ -1,21 +1,36 @@
 # app.py - FSJ LAVAGENS: SISTEMA COMPLETO + TODAS AS PÁGINAS
 import streamlit as st
-import sqlite3
-from datetime import datetime
+from datetime import datetime, date, timedelta
+import calendar
 import pandas as pd
 import re
-import os
-import qrcode
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from io import BytesIO
+from functools import partial
 import plotly.express as px
+from db import (
+    TIPOS_VEICULO, SERVICOS, STATUS_LAVAGEM, init_db,
+    criar_usuario, editar_usuario, excluir_usuario, validar_login, listar_usuarios,
+    criar_veiculo, editar_veiculo, excluir_veiculo, listar_veiculos,
+    criar_fornecedor, editar_fornecedor, excluir_fornecedor, listar_fornecedores,
+    adicionar_preco, editar_preco, excluir_preco, listar_precos_por_fornecedor,
+    indice_precos, id_fornecedor, servicos_disponiveis, fornecedor_mais_barato,
+    sugerir_placas, tipo_veiculo_placa,
+    emitir_ordem, atualizar_status, atualizar_status_lote, atualizar_status_filtrados,
+    atualizar_foto, buscar_lavagens, contar_lavagens, centavos,
+    resumo_por_fornecedor, resumo_por_servico, anos_com_lavagens,
+    contar_cadastros, busca_global, buscar_texto, historico_veiculo, plano_consultas, ErroEscrita,
+    versao_tabelas, mudancas_lavagens, mesclar_pagina,
+)
+from fotos import salvar_foto, caminho_foto
+from pdf_ordem import agendar_pdf_ordem, ler_pdf_ordem, exportar_pdfs, ler_arquivo, LIMITE_PDF_UNICO
+from exportacao import csv_cadastro, csv_lavagens
+from importacao import importar_csv, COLUNAS_CSV
+import desempenho
 
 st.set_page_config(page_title="FSJ Lavagens", layout="wide")
 
+# DESEMPENHO (só mede quando ligado: FSJ_DESEMPENHO=1 ou pela página Desempenho)
+desempenho.iniciar_rerun(st.session_state)
+
 # CSS
 st.markdown("""
 <style>
@@ -27,328 +42,58 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# LISTAS GLOBAIS
-TIPOS_VEICULO = [
-    "TRUCK", "CONJUNTO LS", "REBOQUE", "CAVALO", 
-    "CAMINHÃO 3/4", "CONJUNTO BITREM", "PRANCHA"
-]
-
-SERVICOS = [
-    "LAVAGEM COMPLETA",
-    "LAVAGEM + LUBRIFICAÇÃO",
-    "LAVAGEM COMPLETA + LIMPEZA INTERNA",
-    "LAVAGEM INTERNA DO BAU"
-]
-
 # BANCO DE DADOS
-def init_db():
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-
-    # USUÁRIOS
-    c.execute('''CREATE TABLE IF NOT EXISTS usuarios (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nome TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        senha TEXT NOT NULL,
-        nivel TEXT DEFAULT 'operador',
-        data_cadastro TEXT
-    )''')
-
-    # LAVAGENS
-    c.execute('''CREATE TABLE IF NOT EXISTS lavagens (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        numero_ordem TEXT UNIQUE,
-        placa TEXT NOT NULL,
-        motorista TEXT,
-        operacao TEXT,
-        data TEXT,
-        hora_inicio TEXT,
-        hora_fim TEXT,
-        status TEXT DEFAULT 'Pendente',
-        observacoes TEXT,
-        usuario_criacao TEXT,
-        foto_path TEXT
-    )''')
-
-    # VEÍCULOS
-    c.execute('''CREATE TABLE IF NOT EXISTS veiculos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        placa TEXT UNIQUE NOT NULL,
-        tipo TEXT NOT NULL,
-        modelo_marca TEXT,
-        data_cadastro TEXT
-    )''')
-
-    # FORNECEDORES
-    c.execute('''CREATE TABLE IF NOT EXISTS fornecedores (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        lavador TEXT NOT NULL,
-        cnpj TEXT UNIQUE NOT NULL,
-        endereco TEXT,
-        data_cadastro TEXT
-    )''')
-
-    # TABELA DE PREÇOS
-    c.execute('''CREATE TABLE IF NOT EXISTS precos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        fornecedor_id INTEGER,
-        tipo_veiculo TEXT NOT NULL,
-        servico TEXT NOT NULL,
-        valor REAL NOT NULL,
-        FOREIGN KEY (fornecedor_id) REFERENCES fornecedores (id) ON DELETE CASCADE
-    )''')
-
-    # ADICIONAR COLUNAS SE NÃO EXISTIREM
-    c.execute('PRAGMA table_info(lavagens)')
-    cols = [col[1] for col in c.fetchall()]
-    if 'status' not in cols:
-        c.execute('ALTER TABLE lavagens ADD COLUMN status TEXT DEFAULT "Pendente"')
-    if 'foto_path' not in cols:
-        c.execute('ALTER TABLE lavagens ADD COLUMN foto_path TEXT')
-
-    # ADMIN PADRÃO
-    c.execute('INSERT OR IGNORE INTO usuarios (nome, email, senha, nivel, data_cadastro) VALUES (?, ?, ?, ?, ?)',
-              ('Admin FSJ', 'admin@fsj.com', 'fsj123', 'admin', datetime.now().strftime('%d/%m/%Y %H:%M')))
-    conn.commit()
-    conn.close()
-
 init_db()
 
-# === FUNÇÕES USUÁRIOS ===
-def criar_usuario(nome, email, senha, nivel):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    data_cad = datetime.now().strftime('%d/%m/%Y %H:%M')
-    try:
-        c.execute('INSERT INTO usuarios (nome, email, senha, nivel, data_cadastro) VALUES (?, ?, ?, ?, ?)',
-                  (nome, email, senha, nivel, data_cad))
-        conn.commit()
-        return True
-    except:
-        return False
-    finally:
-        conn.close()
-
-def editar_usuario(id_usuario, nome, email, senha, nivel):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    try:
-        if senha:
-            c.execute('UPDATE usuarios SET nome=?, email=?, senha=?, nivel=? WHERE id=?',
-                      (nome, email, senha, nivel, id_usuario))
-        else:
-            c.execute('UPDATE usuarios SET nome=?, email=?, nivel=? WHERE id=?',
-                      (nome, email, nivel, id_usuario))
-        conn.commit()
-        return True
-    except:
-        return False
-    finally:
-        conn.close()
-
-def excluir_usuario(id_usuario):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM usuarios WHERE id = ?', (id_usuario,))
-    conn.commit()
-    conn.close()
-
-def validar_login(email, senha):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    c.execute('SELECT nome, nivel FROM usuarios WHERE email = ? AND senha = ?', (email, senha))
-    resultado = c.fetchone()
-    conn.close()
-    return resultado
-
-def listar_usuarios():
-    conn = sqlite3.connect('fsj_lavagens.db')
-    df = pd.read_sql_query('SELECT id, nome, email, senha, nivel, data_cadastro FROM usuarios ORDER BY data_cadastro DESC', conn)
-    conn.close()
-    return df
-
-# === FUNÇÕES VEÍCULOS ===
-def criar_veiculo(placa, tipo, modelo_marca):
-    placa = placa.upper().replace("-", "").replace(" ", "")
-    if len(placa) != 7 or not re.match(r"^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$", placa):
-        return False, "Placa inválida"
-    if tipo not in TIPOS_VEICULO:
-        return False, "Tipo inválido"
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    data_cad = datetime.now().strftime('%d/%m/%Y %H:%M')
-    try:
-        c.execute('INSERT INTO veiculos (placa, tipo, modelo_marca, data_cadastro) VALUES (?, ?, ?, ?)',
-                  (placa, tipo, modelo_marca or "", data_cad))
-        conn.commit()
-        return True, "OK"
-    except sqlite3.IntegrityError:
-        return False, "Placa já cadastrada"
-    finally:
-        conn.close()
-
-def editar_veiculo(id_veiculo, placa, tipo, modelo_marca):
-    placa = placa.upper().replace("-", "").replace(" ", "")
-    if len(placa) != 7 or not re.match(r"^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$", placa):
-        return False
-    if tipo not in TIPOS_VEICULO:
-        return False
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    try:
-        c.execute('UPDATE veiculos SET placa = ?, tipo = ?, modelo_marca = ? WHERE id = ?',
-                  (placa, tipo, modelo_marca or "", id_veiculo))
-        conn.commit()
-        return True
-    except:
-        return False
-    finally:
-        conn.close()
-
-def excluir_veiculo(id_veiculo):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM veiculos WHERE id = ?', (id_veiculo,))
-    conn.commit()
-    conn.close()
-
-def listar_veiculos():
-    conn = sqlite3.connect('fsj_lavagens.db')
-    df = pd.read_sql_query('SELECT id, placa, tipo, modelo_marca, data_cadastro FROM veiculos ORDER BY data_cadastro DESC', conn)
-    conn.close()
-    return df
-
-# === FUNÇÕES FORNECEDORES ===
-def criar_fornecedor(lavador, cnpj, endereco):
-    cnpj = re.sub(r'\D', '', cnpj)
-    if len(cnpj) != 14:
-        return False, "CNPJ inválido"
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    data_cad = datetime.now().strftime('%d/%m/%Y %H:%M')
-    try:
-        c.execute('INSERT INTO fornecedores (lavador, cnpj, endereco, data_cadastro) VALUES (?, ?, ?, ?)',
-                  (lavador, cnpj, endereco or "", data_cad))
-        conn.commit()
-        fornecedor_id = c.lastrowid
-        return True, fornecedor_id
-    except sqlite3.IntegrityError:
-        return False, "CNPJ já cadastrado"
-    finally:
-        conn.close()
-
-def editar_fornecedor(id_forn, lavador, cnpj, endereco):
-    cnpj = re.sub(r'\D', '', cnpj)
-    if len(cnpj) != 14:
-        return False
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    try:
-        c.execute('UPDATE fornecedores SET lavador=?, cnpj=?, endereco=? WHERE id=?',
-                  (lavador, cnpj, endereco or "", id_forn))
-        conn.commit()
-        return True
-    except:
-        return False
-    finally:
-        conn.close()
-
-def excluir_fornecedor(id_forn):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM fornecedores WHERE id = ?', (id_forn,))
-    conn.commit()
-    conn.close()
-
-def listar_fornecedores():
-    conn = sqlite3.connect('fsj_lavagens.db')
-    df = pd.read_sql_query('SELECT id, lavador, cnpj, endereco, data_cadastro FROM fornecedores ORDER BY data_cadastro DESC', conn)
-    conn.close()
-    return df
-
-# === FUNÇÕES PREÇOS ===
-def adicionar_preco(fornecedor_id, tipo_veiculo, servico, valor):
-    if tipo_veiculo not in TIPOS_VEICULO or servico not in SERVICOS:
-        return False
-    try:
-        valor = float(valor)
-        if valor <= 0:
-            return False
-    except:
-        return False
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    try:
-        c.execute('INSERT INTO precos (fornecedor_id, tipo_veiculo, servico, valor) VALUES (?, ?, ?, ?)',
-                  (fornecedor_id, tipo_veiculo, servico, valor))
-        conn.commit()
-        return True
-    except:
-        return False
-    finally:
-        conn.close()
-
-def editar_preco(id_preco, tipo_veiculo, servico, valor):
-    try:
-        valor = float(valor)
-        if valor <= 0 or tipo_veiculo not in TIPOS_VEICULO or servico not in SERVICOS:
-            return False
-    except:
-        return False
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    try:
-        c.execute('UPDATE precos SET tipo_veiculo=?, servico=?, valor=? WHERE id=?',
-                  (tipo_veiculo, servico, valor, id_preco))
-        conn.commit()
-        return True
-    except:
-        return False
-    finally:
-        conn.close()
-
-def excluir_preco(id_preco):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM precos WHERE id = ?', (id_preco,))
-    conn.commit()
-    conn.close()
-
-def listar_precos_por_fornecedor(fornecedor_id):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    df = pd.read_sql_query('SELECT id, tipo_veiculo, servico, valor FROM precos WHERE fornecedor_id = ? ORDER BY tipo_veiculo, servico', conn, params=(fornecedor_id,))
-    conn.close()
-    return df
-
-# === FUNÇÕES LAVAGENS ===
-def emitir_ordem(placa, motorista, operacao, hora_inicio, hora_fim, obs, usuario, status="Pendente", foto_path=None):
-    conn = sqlite3.connect('fsj_lavagens.db')
-    c = conn.cursor()
-    data_hoje = datetime.now().strftime('%Y-%m-%d')
-    c.execute('SELECT COUNT(*) FROM lavagens WHERE data = ?', (data_hoje,))
-    contador = c.fetchone()[0] + 1
-    numero_ordem = f"ORD-{data_hoje.replace('-','')}-{contador:03d}"
-    c.execute('''INSERT INTO lavagens 
-    (numero_ordem, placa, motorista, operacao, data, hora_inicio, hora_fim, observacoes, status, usuario_criacao, foto_path)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-    (numero_ordem, placa.upper(), motorista, operacao, data_hoje, hora_inicio, hora_fim, obs, status, usuario, foto_path))
-    conn.commit()
-    conn.close()
-    return numero_ordem
-
-def listar_lavagens():
-    conn = sqlite3.connect('fsj_lavagens.db')
-    df = pd.read_sql_query('SELECT * FROM lavagens ORDER BY data DESC', conn)
-    conn.close()
-    return df
-
 def sair():
     st.session_state.logado = False
     st.session_state.usuario = ""
     st.session_state.nivel = ""
     st.rerun()
 
+def importacao_csv(tipo, titulo):
+    # expander com upload + botão; o resultado fica na sessão até a próxima importação
+    with st.expander(titulo, expanded=False):
+        st.caption(f"Colunas: {COLUNAS_CSV[tipo]} (separador vírgula ou ponto e vírgula)")
+        arquivo = st.file_uploader("Arquivo CSV", type=['csv'], key=f"csv_{tipo}")
+        if arquivo and st.button("Importar", key=f"btn_importar_{tipo}"):
+            try:
+                st.session_state[f"importacao_{tipo}"] = importar_csv(tipo, arquivo.getvalue())
+            except ErroEscrita as erro:
+                st.error(f"Nada foi importado: {erro}")
+        resultado = st.session_state.get(f"importacao_{tipo}")
+        if resultado:
+            gravadas, erros = resultado
+            st.success(f"{gravadas} registro(s) importado(s).")
+            if not erros.empty:
+                st.warning(f"{len(erros)} linha(s) rejeitada(s):")
+                st.dataframe(erros, use_container_width=True, hide_index=True)
+
+def abrir_busca():
+    if st.session_state.busca_global.strip():
+        st.session_state.pagina = "busca"
+
+def seletor_placa(coluna, rotulo, chave, reboque=False):
+    # digita o começo da placa e escolhe entre as primeiras sugestões do índice em memória
+    prefixo = coluna.text_input(f"{rotulo} - início da placa", key=f"{chave}_prefixo", max_chars=7, placeholder="ABC")
+    opcoes = [""] + sugerir_placas(prefixo, reboque=reboque)
+    atual = st.session_state.get(chave)
+    if atual and atual not in opcoes:
+        opcoes.append(atual)
+    return coluna.selectbox(rotulo, opcoes, key=chave)
+
+def data_br(texto, hora=True):
+    # 'aaaa-mm-dd HH:MM:SS' (como está no banco) -> 'dd/mm/aaaa HH:MM' na tela
+    if not texto or len(texto) < 10 or texto[4] != '-':
+        return texto or "-"
+    dia = f"{texto[8:10]}/{texto[5:7]}/{texto[:4]}"
+    return f"{dia} {texto[11:16]}" if hora and len(texto) >= 16 else dia
+
+def cadastrados_este_mes(tabela):
+    inicio = date.today().replace(day=1)
+    fim = (inicio + timedelta(days=32)).replace(day=1)
+    return contar_cadastros(tabela, inicio, fim)
+
 # ESTADO
 if 'pagina' not in st.session_state:
     st.session_state.pagina = "login"
@@ -360,6 +105,8 @@ if 'veiculos_expandido' not in st.session_state:
     st.session_state.veiculos_expandido = True
 if 'fornecedores_expandido' not in st.session_state:
     st.session_state.fornecedores_expandido = True
+if 'sistema_expandido' not in st.session_state:
+    st.session_state.sistema_expandido = True
 if 'editando_usuario' not in st.session_state:
     st.session_state.editando_usuario = None
 if 'confirmar_exclusao_usuario' not in st.session_state:
@@ -382,8 +129,163 @@ if 'preco_serv' not in st.session_state:
     st.session_state.preco_serv = ""
 if 'preco_valor' not in st.session_state:
     st.session_state.preco_valor = 0.0
+if 'controle_filtros' not in st.session_state:
+    st.session_state.controle_filtros = None
+if 'controle_cursores' not in st.session_state:
+    st.session_state.controle_cursores = [None]
+
+LAVAGENS_POR_PAGINA = 50
+
+# CONTROLE DE LAVAGENS: a página atual fica na sessão com a versão de lavagens/fornecedores;
+# a cada rerun só a versão é consultada e, se mudou, só as linhas alteradas são lidas
+ATUALIZACAO_QUADRO_S = 5
+
+def pagina_lavagens(filtros, cursor):
+    chave = (str(filtros), str(cursor))
+    versoes = versao_tabelas('lavagens', 'fornecedores')
+    foto = st.session_state.get('controle_instantaneo')
+    if foto is not None and (foto['chave'] != chave or foto['versoes'][1] != versoes[1]):
+        foto = None  # outra página/filtro, ou nome de lavador alterado
+    if foto is not None and foto['versoes'] != versoes:
+        mudanca = mudancas_lavagens(foto['versoes'][0], **filtros)
+        mesclada = mesclar_pagina(foto['df'], mudanca, cursor, LAVAGENS_POR_PAGINA)
+        if mesclada is None:
+            foto = None
+        else:
+            df, recontar = mesclada
+            foto = {'chave': chave, 'versoes': (mudanca['versao'], versoes[1]), 'df': df,
+                    'total': contar_lavagens(**filtros) if recontar else foto['total']}
+    if foto is None:
+        foto = {'chave': chave, 'versoes': versoes,
+                'df': buscar_lavagens(**filtros, apos=cursor, limite=LAVAGENS_POR_PAGINA + 1),
+                'total': contar_lavagens(**filtros)}
+    st.session_state.controle_instantaneo = foto
+    return foto
+
+def quadro_lavagens(filtros):
+    # roda como st.fragment: com a atualização automática ligada, só este trecho é refeito
+    with desempenho.fragmento("controle_lavagens (atualização)"):
+        cursores = st.session_state.controle_cursores
+        foto = pagina_lavagens(filtros, cursores[-1])
+        df = foto['df']
+        tem_proxima = len(df) > LAVAGENS_POR_PAGINA
+        df = df.head(LAVAGENS_POR_PAGINA)
+
+        if not df.empty:
+            # a chave muda com as linhas exibidas (página, filtros e ordens recarregadas): a seleção
+            # é por posição e não pode passar para outras ordens quando a página é relida
+            tabela = st.dataframe(
+                df[['numero_ordem', 'data', 'placa', 'operacao', 'lavador', 'valor', 'motorista', 'status']]
+                .assign(data=pd.to_datetime(df['data'])),
+                use_container_width=True, hide_index=True,
+                column_config={"numero_ordem": "Nº Ordem", "data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+                               "placa": "Placa",
+                               "operacao": "Operação", "lavador": "Lavador",
+                               "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                               "motorista": "Motorista", "status": "Status"},
+                on_select="rerun", selection_mode="multi-row",
+                key=f"tabela_lavagens_{hash((str(filtros), str(cursores[-1]), tuple(df['id'])))}"
+            )
+
+            # AÇÕES EM LOTE: uma transação e um único recarregamento
+            selecionadas = df.iloc[tabela.selection.rows]['numero_ordem'].tolist()
+            col_acao, col_sel, col_todas = st.columns([2, 1.5, 1.5])
+            novo_status = col_acao.selectbox("Marcar como", ["Em Andamento", "Concluída"], key="status_lote")
+            try:
+                alteradas = None
+                if col_sel.button(f"Selecionadas ({len(selecionadas)})", disabled=not selecionadas, use_container_width=True):
+                    alteradas = atualizar_status_lote(selecionadas, novo_status)
+                if col_todas.button(f"Todas filtradas ({foto['total']})", use_container_width=True):
+                    # pode alterar o histórico inteiro: pede um segundo clique com os mesmos filtros e status
+                    pedido = (str(filtros), novo_status)
+                    if st.session_state.get('confirmar_status_filtrados') == pedido:
+                        del st.session_state.confirmar_status_filtrados
+                        alteradas = atualizar_status_filtrados(novo_status, **filtros)
+                    else:
+                        st.session_state.confirmar_status_filtrados = pedido
+                        st.warning(f"{foto['total']} ordem(ns) serão marcadas como **{novo_status}**. "
+                                   "Clique novamente para confirmar.")
+            except ErroEscrita as erro:
+                st.error(f"Status não alterado: {erro}")
+            if alteradas is not None:
+                st.session_state.aviso_status_lote = f"{alteradas} ordem(ns) marcada(s) como **{novo_status}**"
+                st.rerun()
+            if st.session_state.get('aviso_status_lote'):
+                st.success(st.session_state.pop('aviso_status_lote'))
+
+            col_ant, col_pag, col_prox = st.columns([1, 2, 1])
+            if col_ant.button("◀ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop()
+                st.rerun()
+            col_pag.markdown(f"<div style='text-align:center'>Página {len(cursores)}</div>", unsafe_allow_html=True)
+            if col_prox.button("Próxima ▶", disabled=not tem_proxima, use_container_width=True):
+                ultima = df.iloc[-1]
+                cursores.append((ultima['data'], int(ultima['id'])))
+                st.rerun()
+
+            for _, row in df.iterrows():
+                with st.expander(f"**{row['numero_ordem']}** | {row['placa']} | {row['status']}", expanded=False):
+                    col1, col2 = st.columns([3, 2])
+                    col1.write(f"**Placa:** {row['placa']}")
+                    col1.write(f"**Operação:** {row['operacao']}")
+                    col1.write(f"**Lavador:** {row['lavador'] or '-'}")
+                    col1.write(f"**Data:** {data_br(row['data'])}")
+                    col1.write(f"**Motorista:** {row['motorista']}")
+
+                    status = col2.selectbox(
+                        "Status",
+                        STATUS_LAVAGEM,
+                        index=STATUS_LAVAGEM.index(row['status']),
+                        # status na chave: se mudar por fora (ação em lote), o widget recomeça do valor do banco
+                        key=f"status_{row['numero_ordem']}_{row['status']}"
+                    )
+
+                    if status != row['status']:
+                        try:
+                            atualizar_status(row['numero_ordem'], status)
+                        except ErroEscrita as erro:
+                            col2.error(f"Status não alterado: {erro}")
+                        else:
+                            st.success(f"Status atualizado para **{status}**")
+                            st.rerun()
+
+                    col1.download_button("Baixar PDF", partial(ler_pdf_ordem, row['numero_ordem']),
+                                         f"{row['numero_ordem']}.pdf", "application/pdf", key=f"pdf_{row['numero_ordem']}")
+
+                    miniatura = caminho_foto(row['foto_path'], 'miniatura')
+                    if miniatura:
+                        col2.image(miniatura, caption="Foto do veículo", width=200)
+
+                    foto_nova = col2.file_uploader("Nova foto", type=['png', 'jpg', 'jpeg'], key=f"foto_{row['numero_ordem']}")
+                    if foto_nova:
+                        # o uploader mantém o arquivo entre reruns (e na atualização automática):
+                        # cada arquivo enviado é lido e gravado uma vez só
+                        enviadas = st.session_state.setdefault('fotos_enviadas', {})
+                        if enviadas.get(row['numero_ordem'], {}).get('file_id') != foto_nova.file_id:
+                            try:
+                                enviadas[row['numero_ordem']] = {'file_id': foto_nova.file_id, 'erro': None,
+                                                                 'foto_path': salvar_foto(foto_nova.getvalue())}
+                            except ValueError as erro:
+                                enviadas[row['numero_ordem']] = {'file_id': foto_nova.file_id, 'erro': str(erro),
+                                                                 'foto_path': None}
+                        enviada = enviadas[row['numero_ordem']]
+                        novo_path = enviada['foto_path']
+                        if enviada['erro']:
+                            col2.error(enviada['erro'])
+                        # só grava no banco se a foto mudou
+                        elif novo_path != row['foto_path']:
+                            try:
+                                atualizar_foto(row['numero_ordem'], novo_path)
+                            except ErroEscrita as erro:
+                                col2.error(f"Foto não gravada: {erro}")
+                            else:
+                                st.success("Foto atualizada!")
+                                st.rerun()
+        else:
+            st.info("Nenhuma lavagem encontrada.")
 
 # LOGIN
+desempenho.pagina(st.session_state.pagina)
 if st.session_state.pagina == "login":
     st.title("FSJ Logística - Gerenciador de Lavagens")
     st.subheader("Faça Login")
@@ -407,6 +309,8 @@ else:
     with st.sidebar:
         st.success(f"Logado como: **{st.session_state.usuario}**")
         st.button("Sair", on_click=sair, use_container_width=True)
+        st.text_input("Buscar", key="busca_global", on_change=abrir_busca,
+                      placeholder="Ordem, placa, motorista, lavador, CNPJ...")
         st.markdown("---")
 
         # LAVAGEM
@@ -460,54 +364,65 @@ else:
                 st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
 
+        # SISTEMA (ADMIN)
+        if st.session_state.nivel == "admin":
+            st.markdown('<div class="menu-title">Sistema</div>', unsafe_allow_html=True)
+            submenu_sis = "submenu expanded" if st.session_state.sistema_expandido else "submenu collapsed"
+            st.markdown(f'<div class="{submenu_sis}">', unsafe_allow_html=True)
+            if st.button("Plano de Consultas", key="btn_plano_consultas", use_container_width=True):
+                st.session_state.pagina = "plano_consultas"
+                st.rerun()
+            if st.button("Desempenho", key="btn_desempenho", use_container_width=True):
+                st.session_state.pagina = "desempenho"
+                st.rerun()
+            st.markdown('</div>', unsafe_allow_html=True)
+
     # PÁGINAS
     if st.session_state.pagina == "emitir_ordem":
         st.header("Emitir Ordem de Lavagem")
-        df_veiculos = listar_veiculos()
-        df_fornecedores = listar_fornecedores()
-        placas = [""] + df_veiculos['placa'].tolist()
-        lavadores = [""] + df_fornecedores['lavador'].tolist()
-
-        with st.form("nova_ordem", clear_on_submit=True):
-            data_ordem = datetime.now().strftime("%d/%m/%Y")
-            st.write(f"**Data:** {data_ordem}")
-
-            col1, col2, col3 = st.columns(3)
-            caminhao = col1.selectbox("**CAMINHÃO**", placas, key="caminhao")
-            reboque1 = col2.selectbox("**REBOQUE 1**", placas, key="reboque1")
-            reboque2 = col3.selectbox("**REBOQUE 2**", placas, key="reboque2")
-
-            tipo_veiculo = ""
-            if caminhao and not reboque1 and not reboque2:
-                tipo_row = df_veiculos[df_veiculos['placa'] == caminhao]
-                tipo_veiculo = tipo_row['tipo'].iloc[0] if not tipo_row.empty else ""
-            elif caminhao and reboque1 and not reboque2:
-                tipo_veiculo = "CONJUNTO LS"
-            elif caminhao and reboque1 and reboque2  :
-                tipo_veiculo = "CONJUNTO BITREM"
-
-            st.write(f"**TIPO DE VEÍCULO:** {tipo_veiculo or 'Selecione as placas'}")
-
-            lavador = st.selectbox("**LAVADOR**", lavadores, key="lavador")
-
-            servico = ""
-            valor = 0.0
-            if lavador and tipo_veiculo:
-                forn_id = df_fornecedores[df_fornecedores['lavador'] == lavador].iloc[0]['id']
-                precos_df = listar_precos_por_fornecedor(forn_id)
-                precos_filtrados = precos_df[precos_df['tipo_veiculo'] == tipo_veiculo]
-                servicos_disponiveis = precos_filtrados['servico'].tolist()
-
-                if servicos_disponiveis:
-                    servico = st.selectbox("**SERVIÇO**", servicos_disponiveis, key="servico")
-                    valor_row = precos_filtrados[precos_filtrados['servico'] == servico]
-                    valor = valor_row['valor'].iloc[0] if not valor_row.empty else 0.0
-                    st.write(f"**VALOR:** R$ {valor:.2f}")
-                else:
-                    st.warning("Nenhum serviço cadastrado.")
+        lavadores = [""] + list(indice_precos()['id_por_lavador'])
+
+        # SELEÇÃO (fora do form para tipo/serviço/valor reagirem a cada escolha)
+        data_ordem = datetime.now().strftime("%d/%m/%Y")
+        st.write(f"**Data:** {data_ordem}")
+
+        col1, col2, col3 = st.columns(3)
+        caminhao = seletor_placa(col1, "**CAMINHÃO**", "caminhao")
+        reboque1 = seletor_placa(col2, "**REBOQUE 1**", "reboque1", reboque=True)
+        reboque2 = seletor_placa(col3, "**REBOQUE 2**", "reboque2", reboque=True)
+
+        tipo_veiculo = ""
+        if caminhao and not reboque1 and not reboque2:
+            tipo_veiculo = tipo_veiculo_placa(caminhao) or ""
+        elif caminhao and reboque1 and not reboque2:
+            tipo_veiculo = "CONJUNTO LS"
+        elif caminhao and reboque1 and reboque2  :
+            tipo_veiculo = "CONJUNTO BITREM"
+
+        st.write(f"**TIPO DE VEÍCULO:** {tipo_veiculo or 'Selecione as placas'}")
+
+        lavador = st.selectbox("**LAVADOR**", lavadores, key="lavador")
+
+        servico = ""
+        valor = 0.0
+        forn_id = None
+        if lavador and tipo_veiculo:
+            forn_id = id_fornecedor(lavador)
+            servicos = servicos_disponiveis(forn_id, tipo_veiculo)
+
+            if servicos:
+                servico = st.selectbox("**SERVIÇO**", list(servicos), key="servico")
+                valor = servicos[servico]
+                st.write(f"**VALOR:** R$ {valor:.2f}")
+                barato = fornecedor_mais_barato(tipo_veiculo, servico)
+                if barato and barato[0] != forn_id and barato[2] < valor:
+                    st.caption(f"Mais barato para este serviço: **{barato[1]}** (R$ {barato[2]:.2f})")
             else:
-                st.write("**SERVIÇO/VALOR:** Selecione Lavador + Placas")
+                st.warning("Nenhum serviço cadastrado.")
+        else:
+            st.write("**SERVIÇO/VALOR:** Selecione Lavador + Placas")
 
+        with st.form("nova_ordem", clear_on_submit=True):
             col4, col5 = st.columns(2)
             motorista = col4.text_input("**MOTORISTA**", max_chars=50)
             frota = col5.checkbox("FROTA", key="frota")
@@ -524,143 +439,123 @@ else:
                     if reboque1: placa_final += f" + {reboque1}"
                     if reboque2: placa_final += f" + {reboque2}"
 
-                    foto_path = None
-                    if uploaded_file:
-                        foto_path = f"static/fotos/{uploaded_file.name}"
-                        os.makedirs("static/fotos", exist_ok=True)
-                        with open(foto_path, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
-
-                    ordem = emitir_ordem(
-                        placa=placa_final,
-                        motorista=motorista or "Não informado",
-                        operacao=f"{tipo_veiculo} - {servico}",
-                        hora_inicio="",
-                        hora_fim="",
-                        obs=f"Lavador: {lavador} | Valor: R${valor:.2f} | Frota: {'Sim' if frota else 'Não'} | PX: {'Sim' if px else 'Não'} | {obs}",
-                        usuario=st.session_state.usuario,
-                        status="Pendente",
-                        foto_path=foto_path
-                    )
+                    try:
+                        foto_path = salvar_foto(uploaded_file.getvalue()) if uploaded_file else None
+                        ordem = emitir_ordem(
+                            placa=placa_final,
+                            motorista=motorista or "Não informado",
+                            operacao=f"{tipo_veiculo} - {servico}",
+                            hora_inicio="",
+                            hora_fim="",
+                            obs=obs,
+                            usuario=st.session_state.usuario,
+                            status="Pendente",
+                            foto_path=foto_path,
+                            fornecedor_id=forn_id,
+                            tipo_veiculo=tipo_veiculo,
+                            servico=servico,
+                            valor_centavos=centavos(valor),
+                            frota=frota,
+                            px=px
+                        )
+                    except (ValueError, ErroEscrita) as erro:
+                        st.error(f"Ordem não emitida: {erro}")
+                    else:
+                        # PDF gerado em segundo plano e guardado em static/pdfs
+                        agendar_pdf_ordem(ordem)
+                        st.session_state.ordem_emitida = ordem
+                        st.balloons()
 
-                    # GERAR PDF
-                    buffer = BytesIO()
-                    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*cm)
-                    styles = getSampleStyleSheet()
-                    story = []
-
-                    story.append(Paragraph("<font size=18><b>ORDEM DE LAVAGEM</b></font>", styles['Title']))
-                    story.append(Spacer(1, 0.5*cm))
-
-                    data = [
-                        ["<b>Nº Ordem:</b>", ordem],
-                        ["<b>Data:</b>", datetime.now().strftime("%d/%m/%Y %H:%M")],
-                        ["<b>Placa(s):</b>", placa_final],
-                        ["<b>Tipo:</b>", tipo_veiculo],
-                        ["<b>Lavador:</b>", lavador],
-                        ["<b>Serviço:</b>", servico],
-                        ["<b>Valor:</b>", f"R$ {valor:.2f}"],
-                        ["<b>Motorista:</b>", motorista or "Não informado"],
-                        ["<b>Frota/PX:</b>", f"FROTA: {'Sim' if frota else 'Não'} | PX: {'Sim' if px else 'Não'}"],
-                        ["<b>Status:</b>", "Pendente"],
-                    ]
-                    table = Table(data, colWidths=[3*cm, 10*cm])
-                    table.setStyle(TableStyle([
-                        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1565c0')),
-                        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-                        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-                        ('BACKGROUND', (0,1), (-1,-1), colors.HexColor('#f8f9fa')),
-                    ]))
-                    story.append(table)
-                    story.append(Spacer(1, 0.5*cm))
-
-                    if foto_path and os.path.exists(foto_path):
-                        img = Image(foto_path, width=12*cm, height=8*cm)
-                        img.hAlign = 'CENTER'
-                        story.append(img)
-                        story.append(Spacer(1, 0.3*cm))
-
-                    qr = qrcode.QRCode(version=1, box_size=5, border=2)
-                    qr.add_data(f"https://seusite.com/ordem/{ordem}")
-                    qr.make(fit=True)
-                    img = qr.make_image(fill_color="black", back_color="white")
-                    qr_buffer = BytesIO()
-                    img.save(qr_buffer, format='PNG')
-                    qr_buffer.seek(0)
-                    qr_img = Image(qr_buffer, width=3*cm, height=3*cm)
-                    qr_img.hAlign = 'CENTER'
-                    story.append(qr_img)
-                    story.append(Paragraph("<i>Escaneie para acompanhar</i>", ParagraphStyle('Normal', alignment=1)))
-
-                    doc.build(story)
-                    pdf_data = buffer.getvalue()
-                    buffer.close()
-
-                    st.success(f"**Ordem emitida: {ordem}**")
-                    st.download_button("BAIXAR PDF", pdf_data, f"{ordem}.pdf", "application/pdf")
-                    st.balloons()
+        # download_button não pode ficar dentro de st.form
+        if st.session_state.get('ordem_emitida'):
+            ordem = st.session_state.ordem_emitida
+            st.success(f"**Ordem emitida: {ordem}**")
+            st.download_button("BAIXAR PDF", partial(ler_pdf_ordem, ordem), f"{ordem}.pdf", "application/pdf")
 
     elif st.session_state.pagina == "controle_lavagens":
         st.header("Controle de Lavagens")
-        df = listar_lavagens()
-        if not df.empty:
-            for _, row in df.iterrows():
-                with st.expander(f"**{row['numero_ordem']}** | {row['placa']} | {row['status']}", expanded=False):
-                    col1, col2 = st.columns([3, 2])
-                    col1.write(f"**Placa:** {row['placa']}")
-                    col1.write(f"**Operação:** {row['operacao']}")
-                    col1.write(f"**Data:** {row['data']}")
-                    col1.write(f"**Motorista:** {row['motorista']}")
 
-                    status = col2.selectbox(
-                        "Status",
-                        ["Pendente", "Em Andamento", "Concluída"],
-                        index=["Pendente", "Em Andamento", "Concluída"].index(row['status']),
-                        key=f"status_{row['numero_ordem']}"
-                    )
+        # FILTROS (aplicados no SQL)
+        col1, col2, col3, col4, col5 = st.columns(5)
+        filtro_de = col1.date_input("De", value=None, format="DD/MM/YYYY", key="filtro_de")
+        filtro_ate = col2.date_input("Até", value=None, format="DD/MM/YYYY", key="filtro_ate")
+        filtro_status = col3.selectbox("Status", [""] + STATUS_LAVAGEM, key="filtro_status")
+        filtro_placa = col4.text_input("Placa", max_chars=7, key="filtro_placa")
+        df_forn_filtro = listar_fornecedores()
+        nomes_forn = dict(zip(df_forn_filtro['id'].astype(int), df_forn_filtro['lavador']))
+        filtro_fornecedor = col5.selectbox("Lavador", [None] + list(nomes_forn), key="filtro_lavador",
+                                           format_func=lambda i: nomes_forn.get(i, ""))
+        filtros = dict(data_inicio=filtro_de, data_fim=filtro_ate, status=filtro_status,
+                       placa=filtro_placa, fornecedor_id=filtro_fornecedor)
+
+        # PAGINAÇÃO POR CHAVE: pilha com a última (data, id) de cada página visitada
+        if st.session_state.controle_filtros != filtros:
+            st.session_state.controle_filtros = filtros
+            st.session_state.controle_cursores = [None]
+        auto = st.checkbox(f"Atualizar automaticamente (a cada {ATUALIZACAO_QUADRO_S}s)", key="controle_auto")
+        st.fragment(quadro_lavagens, run_every=ATUALIZACAO_QUADRO_S if auto else None)(filtros)
+
+        # EXPORTAÇÃO EM LOTE (mesmos filtros da lista)
+        with st.expander("Exportar PDFs das ordens filtradas", expanded=False):
+            col1, col2 = st.columns(2)
+            formato = col1.radio("Formato", ["ZIP (um PDF por ordem)", f"PDF único (até {LIMITE_PDF_UNICO} ordens)"],
+                                 key="export_pdf_formato")
+            if col2.button("Gerar arquivo", key="btn_export_pdf", use_container_width=True):
+                # fecha o arquivo anterior da sessão antes de gerar outro
+                anterior = st.session_state.pop('exportacao_pdf', None)
+                if anterior:
+                    anterior[1].close()
+                tipo = "pdf" if formato.startswith("PDF único") else "zip"
+                if tipo == "pdf" and contar_lavagens(**filtros) > LIMITE_PDF_UNICO:
+                    st.error(f"PDF único limitado a {LIMITE_PDF_UNICO} ordens. Use o ZIP ou refine os filtros.")
+                else:
+                    barra = st.progress(0.0, text="Gerando PDFs...")
+                    def _progresso(feitos, total):
+                        barra.progress(feitos / max(total, 1), text=f"Gerando PDFs... {feitos}/{total}")
+                    try:
+                        arquivo = exportar_pdfs(filtros, formato=tipo, progresso=_progresso)
+                    except RuntimeError as erro:
+                        st.error(str(erro))
+                    else:
+                        barra.progress(1.0, text="Concluído!")
+                        st.session_state.exportacao_pdf = (f"ordens.{tipo}", arquivo)
+            if st.session_state.get('exportacao_pdf'):
+                nome_arquivo, arquivo = st.session_state.exportacao_pdf
+                mime = "application/pdf" if nome_arquivo.endswith(".pdf") else "application/zip"
+                st.download_button("Baixar arquivo", partial(ler_arquivo, arquivo), nome_arquivo, mime, key="dl_export_pdf")
 
-                    if status != row['status']:
-                        conn = sqlite3.connect('fsj_lavagens.db')
-                        c = conn.cursor()
-                        c.execute('UPDATE lavagens SET status = ? WHERE numero_ordem = ?', (status, row['numero_ordem']))
-                        conn.commit()
-                        conn.close()
-                        st.success(f"Status atualizado para **{status}**")
-                        st.rerun()
-
-                    if row['foto_path'] and os.path.exists(row['foto_path']):
-                        col2.image(row['foto_path'], caption="Foto do veículo", width=200)
-
-                    foto_nova = col2.file_uploader("Nova foto", type=['png', 'jpg'], key=f"foto_{row['numero_ordem']}")
-                    if foto_nova:
-                        novo_path = f"static/fotos/{foto_nova.name}"
-                        os.makedirs("static/fotos", exist_ok=True)
-                        with open(novo_path, "wb") as f:
-                            f.write(foto_nova.getbuffer())
-                        conn = sqlite3.connect('fsj_lavagens.db')
-                        c = conn.cursor()
-                        c.execute('UPDATE lavagens SET foto_path = ? WHERE numero_ordem = ?', (novo_path, row['numero_ordem']))
-                        conn.commit()
-                        conn.close()
-                        st.success("Foto atualizada!")
-                        st.rerun()
+        with st.expander("Exportar lavagens filtradas (CSV)", expanded=False):
+            st.caption("Usa os mesmos filtros da lista (período, status, placa e lavador).")
+            st.download_button("Baixar CSV", partial(csv_lavagens, filtros), "lavagens.csv", "text/csv", key="dl_lavagens_csv")
 
         st.markdown("---")
         st.subheader("Relatório Mensal")
-        mes = st.selectbox("Mês", [f"{i:02d}/2025" for i in range(1, 13)], index=10)
-        mes_num = mes.split("/")[0]
-        df_mes = df[df['data'].str.contains(f"-{mes_num.zfill(2)}-")]
-        if not df_mes.empty:
-            resumo = df_mes.groupby(['observacoes']).agg({
-                'numero_ordem': 'count'
-            }).reset_index()
-            resumo.columns = ['Lavador', 'Ordens']
+        col1, col2, col3, col4 = st.columns(4)
+        modo = col1.radio("Período", ["Mês", "Intervalo"], horizontal=True, key="rel_modo")
+        if modo == "Mês":
+            hoje = datetime.now()
+            ano = col2.selectbox("Ano", anos_com_lavagens(), key="rel_ano")
+            mes_num = col3.selectbox("Mês", list(range(1, 13)), index=hoje.month - 1, format_func=lambda m: f"{m:02d}", key="rel_mes")
+            rel_inicio = date(ano, mes_num, 1)
+            rel_fim = date(ano, mes_num, calendar.monthrange(ano, mes_num)[1])
+            titulo = f"{mes_num:02d}/{ano}"
+        else:
+            rel_inicio = col2.date_input("De", value=datetime.now().date().replace(day=1), format="DD/MM/YYYY", key="rel_de")
+            rel_fim = col3.date_input("Até", value=datetime.now().date(), format="DD/MM/YYYY", key="rel_ate")
+            titulo = f"{rel_inicio:%d/%m/%Y} a {rel_fim:%d/%m/%Y}"
+        rel_status = col4.selectbox("Status", [""] + STATUS_LAVAGEM, key="rel_status")
+
+        resumo = resumo_por_fornecedor(rel_inicio, rel_fim, rel_status)
+        if not resumo.empty:
             col1, col2 = st.columns(2)
-            col1.dataframe(resumo, use_container_width=True)
-            fig = px.bar(resumo, x='Lavador', y='Ordens', title=f"Total por Lavador - {mes}")
+            col1.dataframe(resumo, use_container_width=True, hide_index=True,
+                           column_config={"Valor": st.column_config.NumberColumn(format="R$ %.2f")})
+            fig = px.bar(resumo, x='Lavador', y='Ordens', title=f"Total por Lavador - {titulo}")
             col2.plotly_chart(fig, use_container_width=True)
+            st.dataframe(resumo_por_servico(rel_inicio, rel_fim, rel_status), use_container_width=True, hide_index=True,
+                         column_config={"Valor": st.column_config.NumberColumn(format="R$ %.2f")})
         else:
-            st.info("Nenhuma lavagem neste mês.")
+            st.info("Nenhuma lavagem neste período.")
 
     elif st.session_state.pagina == "cadastro_usuario":
         st.header("Cadastrar Novo Usuário")
@@ -671,16 +566,18 @@ else:
             nivel = st.selectbox("Nível", ["operador", "admin"])
             if st.form_submit_button("Criar Usuário"):
                 if nome and email and senha:
-                    if criar_usuario(nome, email, senha, nivel):
+                    success, msg = criar_usuario(nome, email, senha, nivel)
+                    if success:
                         st.success(f"Usuário {email} criado!")
                     else:
-                        st.error("E-mail já existe!")
+                        st.error(msg)
                 else:
                     st.error("Preencha todos os campos!")
 
     elif st.session_state.pagina == "pesquisa_usuarios":
         st.header("Lista de Funcionários")
         df = listar_usuarios()
+        st.caption(f"{cadastrados_este_mes('usuarios')} cadastrado(s) este mês")
         if not df.empty:
             header_cols = st.columns([3, 3, 2, 1.5, 1.5])
             header_cols[0].write("**Nome**")
@@ -694,7 +591,7 @@ else:
                 cols = st.columns([3, 3, 2, 1.5, 1.5])
                 cols[0].write(row['nome'])
                 cols[1].write(row['email'])
-                cols[2].write(row['data_cadastro'])
+                cols[2].write(data_br(row['data_cadastro']))
                 cols[3].write(row['nivel'].title())
                 
                 with cols[4]:
@@ -706,11 +603,14 @@ else:
                     with col_del:
                         if st.button("Excluir", key=f"del_usr_{row['id']}"):
                             if st.session_state.get('confirmar_exclusao_usuario') == row['id']:
-                                excluir_usuario(row['id'])
-                                st.success("Usuário excluído!")
-                                if 'confirmar_exclusao_usuario' in st.session_state:
-                                    del st.session_state.confirmar_exclusao_usuario
-                                st.rerun()
+                                success, msg = excluir_usuario(row['id'])
+                                if not success:
+                                    st.error(msg)
+                                else:
+                                    st.success("Usuário excluído!")
+                                    if 'confirmar_exclusao_usuario' in st.session_state:
+                                        del st.session_state.confirmar_exclusao_usuario
+                                    st.rerun()
                             else:
                                 st.session_state.confirmar_exclusao_usuario = row['id']
                                 st.warning("Clique novamente para confirmar.")
@@ -731,19 +631,19 @@ else:
                         
                         col1, col2 = st.columns(2)
                         if col1.form_submit_button("Salvar"):
-                            if editar_usuario(st.session_state.editando_usuario, novo_nome, novo_email, nova_senha, novo_nivel):
+                            success, msg = editar_usuario(st.session_state.editando_usuario, novo_nome, novo_email, nova_senha, novo_nivel)
+                            if success:
                                 st.success("Usuário atualizado!")
                                 del st.session_state.editando_usuario
                                 st.rerun()
                             else:
-                                st.error("E-mail já existe!")
+                                st.error(msg)
                         
                         if col2.form_submit_button("Cancelar"):
                             del st.session_state.editando_usuario
                             st.rerun()
 
-            df_display = df[['nome', 'email', 'data_cadastro', 'nivel']].copy()
-            st.download_button("Baixar Lista (CSV)", df_display.to_csv(index=False).encode('utf-8'), "funcionarios.csv", "text/csv")
+            st.download_button("Baixar Lista (CSV)", partial(csv_cadastro, 'funcionarios'), "funcionarios.csv", "text/csv")
         else:
             st.info("Nenhum usuário cadastrado.")
 
@@ -755,17 +655,22 @@ else:
             modelo_marca = st.text_input("MODELO/MARCA", max_chars=30)
             if st.form_submit_button("Cadastrar Veículo"):
                 if len(placa) == 7 and re.match(r"^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$", placa):
-                    success, _ = criar_veiculo(placa, tipo, modelo_marca)
+                    success, msg = criar_veiculo(placa, tipo, modelo_marca)
                     if success:
                         st.success(f"Veículo **{placa}** cadastrado!")
                     else:
-                        st.error("Placa já cadastrada!")
+                        st.error(msg)
                 else:
                     st.error("Placa inválida! Use: ABC1D23")
+        importacao_csv('veiculos', "Importar veículos (CSV)")
 
     elif st.session_state.pagina == "pesquisa_veiculos":
         st.header("Pesquisa de Veículos")
         df = listar_veiculos()
+        st.caption(f"{cadastrados_este_mes('veiculos')} cadastrado(s) este mês")
+        termo = st.text_input("Filtrar", placeholder="Placa ou modelo", key="filtro_veiculos")
+        if termo:
+            df = df[df['id'].isin(buscar_texto('veiculos', termo, limite=None).get('id', []))]
         if not df.empty:
             header_cols = st.columns([2, 2.5, 2.5, 2, 1.5])
             header_cols[0].write("**Placa**")
@@ -780,7 +685,7 @@ else:
                 cols[0].write(row['placa'])
                 cols[1].write(row['tipo'])
                 cols[2].write(row['modelo_marca'] or "-")
-                cols[3].write(row['data_cadastro'])
+                cols[3].write(data_br(row['data_cadastro']))
                 
                 with cols[4]:
                     col_edit, col_del = st.columns(2)
@@ -791,11 +696,14 @@ else:
                     with col_del:
                         if st.button("Excluir", key=f"del_veic_{row['id']}"):
                             if st.session_state.get('confirmar_exclusao_veiculo') == row['id']:
-                                excluir_veiculo(row['id'])
-                                st.success("Veículo excluído!")
-                                if 'confirmar_exclusao_veiculo' in st.session_state:
-                                    del st.session_state.confirmar_exclusao_veiculo
-                                st.rerun()
+                                success, msg = excluir_veiculo(row['id'])
+                                if not success:
+                                    st.error(msg)
+                                else:
+                                    st.success("Veículo excluído!")
+                                    if 'confirmar_exclusao_veiculo' in st.session_state:
+                                        del st.session_state.confirmar_exclusao_veiculo
+                                    st.rerun()
                             else:
                                 st.session_state.confirmar_exclusao_veiculo = row['id']
                                 st.warning("Clique novamente para confirmar.")
@@ -815,20 +723,41 @@ else:
                         col1, col2 = st.columns(2)
                         if col1.form_submit_button("Salvar"):
                             if len(nova_placa) == 7 and re.match(r"^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$", nova_placa):
-                                if editar_veiculo(st.session_state.editando_veiculo, nova_placa, novo_tipo, novo_modelo):
+                                success, msg = editar_veiculo(st.session_state.editando_veiculo, nova_placa, novo_tipo, novo_modelo)
+                                if success:
                                     st.success("Atualizado!")
                                     del st.session_state.editando_veiculo
                                     st.rerun()
                                 else:
-                                    st.error("Placa já existe!")
+                                    st.error(msg)
                             else:
                                 st.error("Placa inválida!")
                         if col2.form_submit_button("Cancelar"):
                             del st.session_state.editando_veiculo
                             st.rerun()
 
-            df_display = df[['placa', 'tipo', 'modelo_marca', 'data_cadastro']].copy()
-            st.download_button("Baixar CSV", df_display.to_csv(index=False).encode('utf-8'), "veiculos.csv", "text/csv")
+            st.download_button("Baixar CSV", partial(csv_cadastro, 'veiculos'), "veiculos.csv", "text/csv")
+
+            # HISTÓRICO DO VEÍCULO
+            st.markdown("---")
+            st.subheader("Histórico do Veículo")
+            ids_placa = dict(zip(df['placa'], df['id'].astype(int)))
+            placa_hist = st.selectbox("Placa", [""] + list(ids_placa), key="historico_placa")
+            if placa_hist:
+                hist = historico_veiculo(ids_placa[placa_hist])
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Última lavagem", data_br(hist['ultima']) if hist['ultima'] else "-")
+                col2.metric("Lavagens", hist['lavagens'])
+                col3.metric("Total gasto", f"R$ {hist['total']:.2f}")
+                if hist['lavagens']:
+                    fig = px.bar(hist['por_mes'], x='mes', y='lavagens', title=f"Lavagens por mês - {placa_hist}",
+                                 labels={'mes': 'Mês', 'lavagens': 'Lavagens'})
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.dataframe(hist['ultimas'], use_container_width=True, hide_index=True,
+                                 column_config={"numero_ordem": "Nº Ordem", "data": "Data", "posicao": "Posição",
+                                                "placa": "Placa(s)", "servico": "Serviço", "lavador": "Lavador",
+                                                "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                                                "status": "Status"})
         else:
             st.info("Nenhum veículo cadastrado.")
 
@@ -847,10 +776,16 @@ else:
                         st.error(msg)
                 else:
                     st.error("Preencha Lavador e CNPJ!")
+        importacao_csv('fornecedores', "Importar fornecedores (CSV)")
+        importacao_csv('precos', "Importar tabela de preços (CSV)")
 
     elif st.session_state.pagina == "pesquisa_fornecedores":
         st.header("Pesquisa de Fornecedores")
         df = listar_fornecedores()
+        st.caption(f"{cadastrados_este_mes('fornecedores')} cadastrado(s) este mês")
+        termo = st.text_input("Filtrar", placeholder="Lavador, CNPJ ou endereço", key="filtro_fornecedores")
+        if termo:
+            df = df[df['id'].isin(buscar_texto('fornecedores', termo, limite=None).get('id', []))]
         if not df.empty:
             header_cols = st.columns([3, 2.5, 3, 2, 1.5])
             header_cols[0].write("**Lavador**")
@@ -866,7 +801,7 @@ else:
                 cnpj_formatado = f"{row['cnpj'][:2]}.{row['cnpj'][2:5]}.{row['cnpj'][5:8]}/{row['cnpj'][8:12]}-{row['cnpj'][12:]}"
                 cols[1].write(cnpj_formatado)
                 cols[2].write(row['endereco'] or "-")
-                cols[3].write(row['data_cadastro'])
+                cols[3].write(data_br(row['data_cadastro']))
 
                 with cols[4]:
                     col_edit, col_del = st.columns(2)
@@ -877,11 +812,14 @@ else:
                     with col_del:
                         if st.button("Excluir", key=f"del_forn_{row['id']}"):
                             if st.session_state.get('confirmar_exclusao_forn') == row['id']:
-                                excluir_fornecedor(row['id'])
-                                st.success("Fornecedor excluído!")
-                                if 'confirmar_exclusao_forn' in st.session_state:
-                                    del st.session_state.confirmar_exclusao_forn
-                                st.rerun()
+                                success, msg = excluir_fornecedor(row['id'])
+                                if not success:
+                                    st.error(msg)
+                                else:
+                                    st.success("Fornecedor excluído!")
+                                    if 'confirmar_exclusao_forn' in st.session_state:
+                                        del st.session_state.confirmar_exclusao_forn
+                                    st.rerun()
                             else:
                                 st.session_state.confirmar_exclusao_forn = row['id']
                                 st.warning("Clique novamente para confirmar.")
@@ -898,12 +836,13 @@ else:
                         novo_end = st.text_area("Endereço", value=forn['endereco'] or "")
                         col1, col2 = st.columns(2)
                         if col1.form_submit_button("Salvar"):
-                            if editar_fornecedor(st.session_state.editando_fornecedor, novo_lavador, novo_cnpj, novo_end):
+                            success, msg = editar_fornecedor(st.session_state.editando_fornecedor, novo_lavador, novo_cnpj, novo_end)
+                            if success:
                                 st.success("Atualizado!")
                                 del st.session_state.editando_fornecedor
                                 st.rerun()
                             else:
-                                st.error("CNPJ inválido ou duplicado!")
+                                st.error(msg)
                         if col2.form_submit_button("Cancelar"):
                             del st.session_state.editando_fornecedor
                             st.rerun()
@@ -921,11 +860,12 @@ else:
                         serv = st.selectbox("Serviço", SERVICOS, key="novo_serv")
                         valor = st.number_input("Valor (R$)", min_value=0.01, step=5.0, format="%.2f", key="novo_valor")
                         if st.form_submit_button("Adicionar"):
-                            if adicionar_preco(forn_id, tipo, serv, valor):
+                            success, msg = adicionar_preco(forn_id, tipo, serv, valor)
+                            if success:
                                 st.success("Preço adicionado!")
                                 st.rerun()
                             else:
-                                st.error("Erro ao adicionar.")
+                                st.error(msg)
 
                 if not precos_df.empty:
                     st.write("**Preços Cadastrados:**")
@@ -946,9 +886,12 @@ else:
                                     st.rerun()
                             with col_del:
                                 if st.button("Excluir", key=f"del_preco_{row['id']}"):
-                                    excluir_preco(row['id'])
-                                    st.success("Preço removido!")
-                                    st.rerun()
+                                    success, msg = excluir_preco(row['id'])
+                                    if success:
+                                        st.success("Preço removido!")
+                                        st.rerun()
+                                    else:
+                                        st.error(msg)
 
                     if st.session_state.get('editando_preco'):
                         preco_id = st.session_state.editando_preco
@@ -976,14 +919,15 @@ else:
                             )
                             col1, col2 = st.columns(2)
                             if col1.form_submit_button("Salvar Alterações"):
-                                if editar_preco(preco_id, tipo_edit, serv_edit, valor_edit):
+                                success, msg = editar_preco(preco_id, tipo_edit, serv_edit, valor_edit)
+                                if success:
                                     st.success("Preço atualizado!")
                                     for key in ['editando_preco', 'preco_tipo', 'preco_serv', 'preco_valor']:
                                         if key in st.session_state:
                                             del st.session_state[key]
                                     st.rerun()
                                 else:
-                                    st.error("Erro ao salvar.")
+                                    st.error(msg)
                             if col2.form_submit_button("Cancelar"):
                                 for key in ['editando_preco', 'preco_tipo', 'preco_serv', 'preco_valor']:
                                     if key in st.session_state:
@@ -995,12 +939,73 @@ else:
 
             st.download_button(
                 "Baixar Fornecedores (CSV)",
-                df.to_csv(index=False).encode('utf-8'),
+                partial(csv_cadastro, 'fornecedores'),
                 "fornecedores.csv",
                 "text/csv"
             )
         else:
             st.info("Nenhum fornecedor cadastrado.")
 
+    elif st.session_state.pagina == "busca":
+        termo = st.session_state.get('busca_global', "")
+        st.header(f"Busca: {termo}")
+        resultados = busca_global(termo)
+        if not any(len(df) for df in resultados.values()):
+            st.info("Nada encontrado.")
+        if len(resultados['lavagens']):
+            st.subheader(f"Lavagens ({len(resultados['lavagens'])})")
+            st.dataframe(resultados['lavagens'].drop(columns=['id']), use_container_width=True, hide_index=True,
+                         column_config={"numero_ordem": "Nº Ordem", "data": "Data", "placa": "Placa",
+                                        "motorista": "Motorista", "status": "Status", "lavador": "Lavador"})
+        if len(resultados['veiculos']):
+            st.subheader(f"Veículos ({len(resultados['veiculos'])})")
+            st.dataframe(resultados['veiculos'].drop(columns=['id']), use_container_width=True, hide_index=True,
+                         column_config={"placa": "Placa", "tipo": "Tipo", "modelo_marca": "Modelo/Marca"})
+        if len(resultados['fornecedores']):
+            st.subheader(f"Fornecedores ({len(resultados['fornecedores'])})")
+            st.dataframe(resultados['fornecedores'].drop(columns=['id']), use_container_width=True, hide_index=True,
+                         column_config={"lavador": "Lavador", "cnpj": "CNPJ", "endereco": "Endereço"})
+
+    elif st.session_state.pagina == "plano_consultas" and st.session_state.nivel == "admin":
+        st.header("Plano de Consultas")
+        st.caption("EXPLAIN QUERY PLAN das consultas principais. Nenhuma deve fazer varredura completa da tabela.")
+        df_plano = plano_consultas()
+        st.dataframe(df_plano, use_container_width=True, hide_index=True)
+        if df_plano['Varredura completa'].any():
+            st.warning("Há consultas lendo a tabela inteira. Verifique os índices.")
+        else:
+            st.success("Todas as consultas usam índice.")
+
+    elif st.session_state.pagina == "desempenho" and st.session_state.nivel == "admin":
+        st.header("Desempenho")
+        ligado = st.checkbox("Medir desempenho (consultas SQL, páginas, PDF e fotos)", value=desempenho.ATIVO)
+        if ligado != desempenho.ATIVO:
+            if ligado:
+                desempenho.ativar()
+            else:
+                desempenho.desativar()
+            st.rerun()
+        if desempenho.ARQUIVO_LOG:
+            st.caption(f"Cada rerun também é gravado em {desempenho.ARQUIVO_LOG} (JSON lines).")
+        st.caption(f"Últimos {len(desempenho.HISTORICO)} rerun(s) deste processo.")
+
+        st.subheader("Tempo por página")
+        st.dataframe(desempenho.tempo_por_pagina(), use_container_width=True, hide_index=True)
+        st.subheader("Consultas mais lentas")
+        st.dataframe(desempenho.consultas_mais_lentas(), use_container_width=True, hide_index=True)
+        st.subheader("Consultas por comando")
+        st.dataframe(desempenho.consultas_agrupadas(), use_container_width=True, hide_index=True)
+        st.subheader("PDF e fotos")
+        st.dataframe(desempenho.tempos_medidos(), use_container_width=True, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        col1.download_button("Baixar medições (JSONL)", desempenho.exportar_jsonl, "desempenho.jsonl",
+                             "application/jsonl", key="dl_desempenho")
+        if col2.button("Limpar medições", key="btn_limpar_desempenho"):
+            desempenho.limpar()
+            st.rerun()
+
 st.markdown("---")
 st.markdown("*FSJ Logística - Sistema por Grok*")
+
+desempenho.finalizar_rerun()
@@ -0,0 +1,44 @@
+# arquivos.py - FSJ LAVAGENS: GRAVAÇÃO EM DISCO E TAREFAS EM SEGUNDO PLANO
+# Usado pelo armazenamento de fotos (fotos.py) e de PDFs (pdf_ordem.py).
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# GRAVAÇÃO ATÔMICA: escreve num temporário e troca pelo definitivo com os.replace,
+# então quem lê nunca vê um arquivo pela metade
+@contextmanager
+def gravacao_atomica(caminho):
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield temporario
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    os.replace(temporario, caminho)
+
+def gravar(caminho, dados):
+    with gravacao_atomica(caminho) as temporario, open(temporario, 'wb') as f:
+        f.write(dados)
+
+# UMA TAREFA POR CHAVE: pedir de novo enquanto ela roda devolve o mesmo futuro
+def agendador_unico(nome, max_workers=2):
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=nome)
+    pendentes = {}
+    lock = threading.RLock()  # o callback roda na hora se o futuro já terminou
+
+    def descartar(chave, futuro):
+        with lock:
+            if pendentes.get(chave) is futuro:
+                del pendentes[chave]
+
+    def agendar(chave, func, *args):
+        with lock:
+            futuro = pendentes.get(chave)
+            if futuro is None or futuro.done():
+                futuro = executor.submit(func, *args)
+                pendentes[chave] = futuro
+                futuro.add_done_callback(lambda f: descartar(chave, f))
+            return futuro
+    return agendar
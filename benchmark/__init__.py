@@ -0,0 +1,2 @@
+# benchmark - FSJ LAVAGENS: DADOS SINTÉTICOS E MEDIÇÕES DE DESEMPENHO
+# Uso: python -m benchmark [--db bench.db] [--saida resultado.json] [--comparar anterior.json]
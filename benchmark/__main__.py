@@ -0,0 +1,39 @@
+# python -m benchmark: gera (ou reaproveita) o banco sintético, mede e grava o JSON
+import os
+import json
+import argparse
+from datetime import date
+from benchmark import dados, medicoes
+
+parser = argparse.ArgumentParser(description="Benchmark FSJ Lavagens")
+parser.add_argument('--db', default='benchmark_fsj.db', help="banco sintético (gerado se não existir)")
+parser.add_argument('--recriar', action='store_true', help="gera o banco de novo mesmo se já existir")
+parser.add_argument('--veiculos', type=int, default=dados.PADRAO['veiculos'])
+parser.add_argument('--fornecedores', type=int, default=dados.PADRAO['fornecedores'])
+parser.add_argument('--lavagens', type=int, default=dados.PADRAO['lavagens'])
+parser.add_argument('--anos', type=int, default=dados.PADRAO['anos'])
+parser.add_argument('--data-final', type=date.fromisoformat, default=dados.PADRAO['data_final'])
+parser.add_argument('--semente', type=int, default=dados.PADRAO['semente'])
+parser.add_argument('--sem-paginas', action='store_true', help="pula as medições de página (AppTest)")
+parser.add_argument('--saida', default='benchmark_resultado.json')
+parser.add_argument('--comparar', help="JSON de uma execução anterior")
+args = parser.parse_args()
+
+if args.recriar or not os.path.exists(args.db):
+    dados.gerar(args.db, veiculos=args.veiculos, fornecedores=args.fornecedores, lavagens=args.lavagens,
+                anos=args.anos, data_final=args.data_final, semente=args.semente)
+
+resultado = medicoes.executar(args.db, paginas=not args.sem_paginas)
+resultado['parametros'] = {k: str(v) for k, v in vars(args).items()}
+with open(args.saida, 'w', encoding='utf-8') as f:
+    json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+for nome, r in resultado['resultados'].items():
+    print(f"{nome:45} p50 {r['p50_ms']:>10.2f} ms   p95 {r['p95_ms']:>10.2f} ms   (n={r['n']})")
+if args.comparar:
+    with open(args.comparar, encoding='utf-8') as f:
+        anterior = json.load(f)
+    print("\nComparação (p50):")
+    for nome, antes, depois, variacao in medicoes.comparar(anterior, resultado):
+        print(f"{nome:45} {antes:>10.2f} -> {depois:>10.2f} ms  ({variacao:+.1f}%)")
+print(f"\nResultado gravado em {args.saida}")
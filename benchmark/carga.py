@@ -0,0 +1,141 @@
+# benchmark/carga.py - GERADOR DE CARGA CONCORRENTE (vários processos no mesmo banco)
+# Simula operadores simultâneos: cada processo emite ordens, muda status e troca
+# fotos num banco de rascunho, e o relatório junta latências, travamentos e colisões.
+# Uso: python -m benchmark.carga --processos 8 --duracao 30 --mix emitir=60,status=30,foto=10
+import os
+import time
+import json
+import random
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import db
+from benchmark import dados
+from benchmark.medicoes import estatisticas, copiar_banco
+
+OPERACOES = ['emitir', 'status', 'foto']
+
+def _mix(texto):
+    # "emitir=60,status=30,foto=10" -> {'emitir': 60, ...}
+    pesos = {}
+    for parte in texto.split(','):
+        nome, _, peso = parte.partition('=')
+        if nome.strip() not in OPERACOES:
+            raise argparse.ArgumentTypeError(f"operação desconhecida: {nome}")
+        pesos[nome.strip()] = float(peso or 1)
+    return pesos
+
+def _erro_travado(erro):
+    # BancoOcupado: o escritor único esgotou as tentativas
+    return isinstance(erro, db.BancoOcupado) or (
+        isinstance(erro, sqlite3.OperationalError) and ('locked' in str(erro) or 'busy' in str(erro)))
+
+# PROCESSO TRABALHADOR
+def _trabalhador(indice, caminho, mix, duracao, taxa, inicio, semente):
+    db.configurar(caminho)
+    rng = random.Random(semente + indice)
+    placas = db.indice_placas()['todas']
+    forn_ids = sorted(db.indice_precos()['precos'])
+    with db.conexao() as conn:
+        numeros = [n for (n,) in conn.execute('SELECT numero_ordem FROM lavagens ORDER BY id DESC LIMIT 1000')]
+    nomes, pesos = list(mix), list(mix.values())
+    latencias = {op: [] for op in OPERACOES}
+    erros = Counter()
+    emitidas = []
+
+    def emitir():
+        forn_id = rng.choice(forn_ids)
+        tipo, servicos = rng.choice(list(db.indice_precos()['precos'][forn_id].items()))
+        servico, valor = rng.choice(list(servicos.items()))
+        numero = db.emitir_ordem(rng.choice(placas), "Carga", f"{tipo} - {servico}", "", "", "", f"carga-{indice}",
+                                 fornecedor_id=forn_id, tipo_veiculo=tipo, servico=servico, valor_centavos=db.centavos(valor))
+        emitidas.append(numero)
+        numeros.append(numero)
+
+    acoes = {
+        'emitir': emitir,
+        'status': lambda: db.atualizar_status(rng.choice(numeros), rng.choice(db.STATUS_LAVAGEM)),
+        # só o caminho de escrita no banco (o arquivo da foto não é gravado)
+        'foto': lambda: db.atualizar_foto(rng.choice(numeros), f"static/fotos/{rng.getrandbits(256):064x}.jpg"),
+    }
+
+    time.sleep(max(0.0, inicio - time.time()))  # todos começam juntos
+    fim = inicio + duracao
+    proxima = time.time()
+    while time.time() < fim:
+        if taxa:
+            proxima += rng.expovariate(taxa)  # chegadas de Poisson
+            time.sleep(max(0.0, proxima - time.time()))
+        op = rng.choices(nomes, pesos)[0]
+        t0 = time.perf_counter()
+        try:
+            acoes[op]()
+            latencias[op].append((time.perf_counter() - t0) * 1000)
+        except sqlite3.IntegrityError as e:
+            erros['colisao_numero_ordem' if 'numero_ordem' in str(e) else 'integridade'] += 1
+        except sqlite3.Error as e:
+            erros['banco_travado' if _erro_travado(e) else 'outros'] += 1
+    db.fechar_conexoes()
+    return {'latencias': latencias, 'erros': dict(erros), 'emitidas': emitidas}
+
+# EXECUÇÃO E RELATÓRIO
+def executar(caminho, processos=4, duracao=10.0, taxa=0.0, mix=None, semente=7):
+    mix = mix or {'emitir': 60, 'status': 30, 'foto': 10}
+    inicio = time.time() + 2.0  # tempo para todos os processos subirem
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        futuros = [pool.submit(_trabalhador, i, caminho, mix, duracao, taxa, inicio, semente) for i in range(processos)]
+        parciais = [f.result() for f in futuros]
+
+    latencias = {op: [t for p in parciais for t in p['latencias'][op]] for op in OPERACOES}
+    erros = Counter()
+    for p in parciais:
+        erros.update(p['erros'])
+    emitidas = Counter(n for p in parciais for n in p['emitidas'])
+    db.configurar(caminho)
+    with db.conexao() as conn:
+        duplicadas_banco = conn.execute(
+            'SELECT COUNT(*) FROM (SELECT numero_ordem FROM lavagens GROUP BY numero_ordem HAVING COUNT(*) > 1)').fetchone()[0]
+    todas = [t for lista in latencias.values() for t in lista]
+    return {
+        'executado_em': db.agora(),
+        'parametros': {'processos': processos, 'duracao_s': duracao, 'taxa_por_processo': taxa, 'mix': mix},
+        'operacoes': len(todas),
+        'vazao_ops_s': round(len(todas) / duracao, 1),
+        'latencia': estatisticas(todas) if todas else None,
+        'por_operacao': {op: dict(estatisticas(l), vazao_ops_s=round(len(l) / duracao, 1))
+                         for op, l in latencias.items() if l},
+        'erros': {'banco_travado': erros['banco_travado'], 'colisao_numero_ordem': erros['colisao_numero_ordem'],
+                  'integridade': erros['integridade'], 'outros': erros['outros']},
+        'numeros_repetidos_entre_processos': sum(1 for qtd in emitidas.values() if qtd > 1),
+        'numeros_repetidos_no_banco': duplicadas_banco,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Carga concorrente FSJ Lavagens")
+    parser.add_argument('--base', help="banco a copiar como rascunho (padrão: gera um pequeno)")
+    parser.add_argument('--processos', type=int, default=4)
+    parser.add_argument('--duracao', type=float, default=10.0, help="segundos")
+    parser.add_argument('--taxa', type=float, default=0.0, help="operações/s por processo (0 = sem limite)")
+    parser.add_argument('--mix', type=_mix, default='emitir=60,status=30,foto=10')
+    parser.add_argument('--semente', type=int, default=7)
+    parser.add_argument('--saida', help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        if args.base:
+            caminho = copiar_banco(args.base, pasta)
+        else:
+            caminho = dados.gerar(os.path.join(pasta, 'carga.db'), veiculos=500, fornecedores=20, lavagens=5000,
+                                  semente=args.semente, progresso=lambda msg: None)
+        db.fechar_conexoes()
+        relatorio = executar(caminho, args.processos, args.duracao, args.taxa, args.mix, args.semente)
+        db.fechar_conexoes()
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,97 @@
+# benchmark/dados.py - GERADOR DETERMINÍSTICO DE DADOS SINTÉTICOS
+# Mesma semente + mesmos parâmetros = mesmo banco, para comparar execuções.
+import os
+import random
+from datetime import date, timedelta
+import db
+
+LETRAS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+MOTORISTAS = ["João Silva", "Maria Souza", "Pedro Almeida", "Ana Lima", "Carlos Pereira",
+              "José Santos", "Paulo Oliveira", "Marcos Rocha", "Lucas Costa", "Rafael Gomes"]
+TIPOS_CAVALO = [t for t in db.TIPOS_VEICULO if t not in db.TIPOS_REBOQUE + ["CONJUNTO LS", "CONJUNTO BITREM"]]
+DIAS_POR_TRANSACAO = 30
+
+PADRAO = dict(veiculos=5000, fornecedores=200, lavagens=500_000, anos=3,
+              data_final=date(2025, 12, 31), semente=42)
+
+def _placa(rng):
+    return (''.join(rng.choice(LETRAS) for _ in range(3)) + str(rng.randint(0, 9)) +
+            rng.choice(LETRAS + '0123456789') + f"{rng.randint(0, 99):02d}")
+
+def _cnpj(i):
+    return f"{10000000 + i:08d}0001{i % 100:02d}"
+
+def _status(rng, data, data_final):
+    # ordens antigas quase sempre concluídas; as dos últimos dias ainda em aberto
+    idade = (data_final - data).days
+    if idade > 7:
+        return "Concluída" if rng.random() < 0.97 else "Pendente"
+    return rng.choice(db.STATUS_LAVAGEM)
+
+def gerar(caminho, veiculos=PADRAO['veiculos'], fornecedores=PADRAO['fornecedores'], lavagens=PADRAO['lavagens'],
+          anos=PADRAO['anos'], data_final=PADRAO['data_final'], semente=PADRAO['semente'], progresso=print):
+    rng = random.Random(semente)
+    for sufixo in ('', '-wal', '-shm'):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+    db.configurar(caminho)
+    db.init_db()
+
+    # CADASTROS (pelos importadores em lote)
+    placas = set()
+    while len(placas) < veiculos:
+        placas.add(_placa(rng))
+    placas = sorted(placas)
+    tipos = {placa: (rng.choice(db.TIPOS_REBOQUE) if rng.random() < 0.4 else rng.choice(TIPOS_CAVALO)) for placa in placas}
+    db.importar_veiculos([dict(placa=placa, tipo=tipo, modelo_marca="Sintético") for placa, tipo in tipos.items()])
+    db.importar_fornecedores([dict(lavador=f"Lavador {i:03d}", cnpj=_cnpj(i), endereco=f"Rua {i}, {rng.randint(1, 999)}")
+                              for i in range(1, fornecedores + 1)])
+    db.importar_precos([dict(cnpj=_cnpj(i), tipo_veiculo=tipo, servico=servico, valor=f"{rng.randint(80, 600)}.00")
+                        for i in range(1, fornecedores + 1) for tipo in db.TIPOS_VEICULO for servico in db.SERVICOS])
+    progresso(f"cadastros: {veiculos} veículos, {fornecedores} fornecedores")
+
+    indice = db.indice_precos()
+    forn_ids = sorted(indice['precos'])
+    cavalos = [p for p in placas if tipos[p] not in db.TIPOS_REBOQUE]
+    reboques = [p for p in placas if tipos[p] in db.TIPOS_REBOQUE]
+
+    # LAVAGENS: distribuídas por dia ao longo de `anos`, numeradas pela mesma sequência do sistema
+    dias = anos * 365
+    inicio = data_final - timedelta(days=dias - 1)
+    por_dia = [0] * dias
+    for _ in range(lavagens):
+        por_dia[rng.randrange(dias)] += 1
+    emitidas = 0
+    for bloco in range(0, dias, DIAS_POR_TRANSACAO):
+        with db.transacao() as conn:
+            for d in range(bloco, min(bloco + DIAS_POR_TRANSACAO, dias)):
+                if not por_dia[d]:
+                    continue
+                data = inicio + timedelta(days=d)
+                linhas = []
+                for numero in db._reservar_numeros(conn, data.isoformat(), por_dia[d]):
+                    conjunto = [rng.choice(cavalos)]
+                    sorteio = rng.random()
+                    if sorteio < 0.5:
+                        conjunto.append(rng.choice(reboques))
+                    if sorteio < 0.2:
+                        conjunto.append(rng.choice(reboques))
+                    tipo = tipos[conjunto[0]] if len(conjunto) == 1 else ("CONJUNTO LS" if len(conjunto) == 2 else "CONJUNTO BITREM")
+                    forn_id = rng.choice(forn_ids)
+                    servico = rng.choice(db.SERVICOS)
+                    valor = indice['precos'][forn_id][tipo][servico]
+                    momento = f"{data.isoformat()} {rng.randint(6, 20):02d}:{rng.randint(0, 59):02d}:00"
+                    linhas.append((numero, " + ".join(conjunto), rng.choice(MOTORISTAS), f"{tipo} - {servico}", data.isoformat(),
+                                   "", "", "", _status(rng, data, data_final), "admin@fsj.com", forn_id, tipo, servico,
+                                   db.centavos(valor), int(rng.random() < 0.3), int(rng.random() < 0.1), momento, momento))
+                conn.executemany('''INSERT INTO lavagens
+                    (numero_ordem, placa, motorista, operacao, data, hora_inicio, hora_fim, observacoes, status, usuario_criacao,
+                     fornecedor_id, tipo_veiculo, servico, valor_centavos, frota, px, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', linhas)
+                emitidas += len(linhas)
+        progresso(f"lavagens: {emitidas}/{lavagens}")
+
+    # vínculos ordem-veículo pelo mesmo backfill da migração
+    with db.transacao() as conn:
+        db._m009_lavagem_veiculos(conn)
+    return caminho
@@ -0,0 +1,134 @@
+# benchmark/medicoes.py - MEDIÇÕES CRONOMETRADAS
+# Roda sobre uma cópia do banco gerado (as escritas não alteram a base) e devolve
+# um dict pronto para JSON: estatísticas em milissegundos por medição.
+import os
+import sys
+import time
+import random
+import sqlite3
+import platform
+import tempfile
+from datetime import date, timedelta
+import db
+import pdf_ordem
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+PAGINAS = ["emitir_ordem", "controle_lavagens", "pesquisa_usuarios", "pesquisa_veiculos", "pesquisa_fornecedores"]
+
+def estatisticas(tempos):
+    ordenados = sorted(tempos)
+    def percentil(p):
+        return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+    return {'n': len(tempos), 'media_ms': round(sum(tempos) / len(tempos), 3), 'p50_ms': round(percentil(50), 3),
+            'p95_ms': round(percentil(95), 3), 'p99_ms': round(percentil(99), 3), 'max_ms': round(ordenados[-1], 3)}
+
+def cronometrar(func, repeticoes, argumentos=None):
+    # argumentos(i) -> tupla de argumentos da i-ésima chamada (preparados fora do tempo medido)
+    tempos = []
+    for i in range(repeticoes):
+        args = argumentos(i) if argumentos else ()
+        inicio = time.perf_counter()
+        func(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return estatisticas(tempos)
+
+def copiar_banco(origem, pasta):
+    destino = os.path.join(pasta, 'bench.db')
+    with sqlite3.connect(origem) as src, sqlite3.connect(destino) as dst:
+        src.backup(dst)
+    return destino
+
+def _contagens():
+    with db.conexao() as conn:
+        return {t: conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0]
+                for t in ('veiculos', 'fornecedores', 'precos', 'lavagens')}
+
+# FUNÇÕES DE DADOS E PDF
+def medir_dados(rng):
+    r = {}
+    placas = db.indice_placas()['todas']
+    forn_ids = sorted(db.indice_precos()['precos'])
+    ultima = db.buscar_lavagens(limite=1)['data'].iloc[0]
+    mes = date.fromisoformat(ultima).replace(day=1)
+    fim_mes = (mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    def nova_ordem(i):
+        forn_id = rng.choice(forn_ids)
+        tipo, servicos = next(iter(db.indice_precos()['precos'][forn_id].items()))
+        servico, valor = next(iter(servicos.items()))
+        return (rng.choice(placas), "Benchmark", f"{tipo} - {servico}", "", "", "", "benchmark", "Pendente", None,
+                forn_id, tipo, servico, db.centavos(valor))
+    r['emitir_ordem'] = cronometrar(db.emitir_ordem, 200, nova_ordem)
+    r['listar_lavagens'] = cronometrar(db.listar_lavagens, 3)
+    r['buscar_lavagens (1ª página)'] = cronometrar(lambda: db.buscar_lavagens(limite=51), 50)
+    r['buscar_lavagens (status + lavador)'] = cronometrar(
+        lambda f: db.buscar_lavagens(status="Pendente", fornecedor_id=f, limite=51), 50, lambda i: (rng.choice(forn_ids),))
+    r['listar_precos_por_fornecedor (sem cache)'] = cronometrar(
+        db._listar_precos_por_fornecedor.sem_cache, 200, lambda i: (rng.choice(forn_ids),))
+    for forn_id in forn_ids:  # aquece o cache antes de medir os acertos
+        db.listar_precos_por_fornecedor(forn_id)
+    r['listar_precos_por_fornecedor (com cache)'] = cronometrar(
+        db.listar_precos_por_fornecedor, 200, lambda i: (rng.choice(forn_ids),))
+    # relatórios: a consulta em si (no app ficam em cache até lavagens mudar de versão)
+    por_fornecedor, por_servico = db.resumo_por_fornecedor.sem_cache, db.resumo_por_servico.sem_cache
+    r['relatorio_mensal'] = cronometrar(
+        lambda: (por_fornecedor(mes, fim_mes), por_servico(mes, fim_mes)), 50)
+    r['relatorio_anual'] = cronometrar(
+        lambda: (por_fornecedor(mes.replace(month=1), fim_mes), por_servico(mes.replace(month=1), fim_mes)), 20)
+    # feed de mudanças: sonda de versão (rerun sem mudança) e leitura de uma alteração
+    r['versao_tabelas (sonda)'] = cronometrar(lambda: db.versao_tabelas('lavagens', 'fornecedores'), 200)
+    versao = db.versao_tabelas('lavagens')[0]
+    db.atualizar_status(db.buscar_lavagens(limite=1)['numero_ordem'][0], "Em Andamento")
+    r['mudancas_lavagens (1 alteração)'] = cronometrar(lambda: db.mudancas_lavagens(versao), 50)
+    ordens = [db.obter_lavagem(n) for n in db.buscar_lavagens(limite=50)['numero_ordem']]
+    r['gerar_pdf_ordem'] = cronometrar(pdf_ordem.gerar_pdf_ordem, len(ordens), lambda i: (ordens[i],))
+    return r
+
+# PÁGINAS (AppTest: o script inteiro roda a cada medição, como num rerun)
+def medir_paginas(repeticoes=5):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.run()
+    at.text_input[0].input('admin@fsj.com')
+    at.text_input[1].input('fsj123')
+    at.button[0].click()
+    at.run()
+    r = {}
+    for pagina in PAGINAS:
+        at.session_state.pagina = pagina
+        def rodar():
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"{pagina}: {at.exception[0].value}")
+        r[f"pagina {pagina}"] = cronometrar(rodar, repeticoes)
+    return r
+
+def executar(caminho_banco, paginas=True, semente=1):
+    rng = random.Random(semente)
+    with tempfile.TemporaryDirectory() as pasta:
+        db.configurar(copiar_banco(caminho_banco, pasta))
+        db.init_db()
+        contagens = _contagens()
+        resultados = medir_dados(rng)
+        if paginas:
+            os.environ['FSJ_DB'] = db.DB_PATH
+            resultados.update(medir_paginas())
+        db.fechar_conexoes()
+    return {
+        'executado_em': db.agora(),
+        'banco': os.path.abspath(caminho_banco),
+        'contagens': contagens,
+        'ambiente': {'python': sys.version.split()[0], 'sqlite': sqlite3.sqlite_version,
+                     'plataforma': platform.platform(), 'cpus': os.cpu_count()},
+        'resultados': resultados,
+    }
+
+def comparar(anterior, atual):
+    # linhas (medição, p50 antes, p50 depois, variação %) para as medições presentes nos dois
+    linhas = []
+    for nome, depois in atual['resultados'].items():
+        antes = anterior.get('resultados', {}).get(nome)
+        if antes:
+            variacao = (depois['p50_ms'] - antes['p50_ms']) / antes['p50_ms'] * 100 if antes['p50_ms'] else 0.0
+            linhas.append((nome, antes['p50_ms'], depois['p50_ms'], round(variacao, 1)))
+    return linhas
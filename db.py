@@ -0,0 +1,1464 @@
+# db.py - FSJ LAVAGENS: CAMADA DE ACESSO AO BANCO (SQLite)
+import os
+import re
+import time
+import queue
+import bisect
+import random
+import functools
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+# LISTAS GLOBAIS
+TIPOS_VEICULO = [
+    "TRUCK", "CONJUNTO LS", "REBOQUE", "CAVALO",
+    "CAMINHÃO 3/4", "CONJUNTO BITREM", "PRANCHA"
+]
+
+SERVICOS = [
+    "LAVAGEM COMPLETA",
+    "LAVAGEM + LUBRIFICAÇÃO",
+    "LAVAGEM COMPLETA + LIMPEZA INTERNA",
+    "LAVAGEM INTERNA DO BAU"
+]
+
+STATUS_LAVAGEM = ["Pendente", "Em Andamento", "Concluída"]
+
+# CONFIGURAÇÃO
+DB_PATH = os.environ.get('FSJ_DB', 'fsj_lavagens.db')
+POOL_MAX = 8
+BUSY_TIMEOUT_MS = 5000
+CACHE_STATEMENTS = 256
+FABRICA_CONEXAO = sqlite3.Connection  # desempenho.ativar() troca pela conexão medida
+
+def agora():
+    # carimbo de data/hora gravado no banco (ISO-8601, hora local)
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+# POOL DE CONEXÕES (uma por processo, compartilhado entre as threads do Streamlit)
+_pool = queue.LifoQueue(maxsize=POOL_MAX)
+_geracao_conexoes = 0
+
+def _nova_conexao():
+    # isolation_level=None: as transações são abertas explicitamente (escritor único, transacao(), migrar())
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                           check_same_thread=False, cached_statements=CACHE_STATEMENTS,
+                           factory=FABRICA_CONEXAO)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    return conn
+
+@contextmanager
+def conexao():
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _nova_conexao()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+@contextmanager
+def transacao():
+    # BEGIN IMMEDIATE reserva o lock de escrita logo no início, evitando deadlock de upgrade.
+    # Gravação direta, fora do escritor único: só para scripts e cargas em massa
+    with conexao() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+def fechar_conexoes():
+    global _geracao_conexoes
+    _geracao_conexoes += 1  # a conexão do escritor é refeita no próximo lote
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+def configurar(caminho):
+    global DB_PATH, _migrado
+    fechar_conexoes()
+    DB_PATH = caminho
+    _migrado = False
+    limpar_cache()
+
+# ESCRITOR ÚNICO: todas as gravações do processo passam por uma fila e por uma
+# thread só. Pedidos que chegam juntos vão numa mesma transação, cada um no seu
+# SAVEPOINT (o erro de um não desfaz os outros). Se outro processo estiver
+# gravando (SQLITE_BUSY), o lote é repetido com espera crescente.
+LOTE_ESCRITA = 32
+PODA_EXCLUSOES_S = 3600  # de quanto em quanto tempo a thread de escrita poda as exclusões
+TENTATIVAS_ESCRITA = 5
+ESPERA_ESCRITA_S = 0.05
+BUSY_ESCRITOR_MS = 1000
+
+class ErroEscrita(sqlite3.DatabaseError):
+    pass
+
+class BancoOcupado(ErroEscrita, sqlite3.OperationalError):
+    # o lock de escrita não saiu depois de todas as tentativas
+    def __init__(self, mensagem="Banco de dados ocupado por outra gravação. Tente novamente."):
+        super().__init__(mensagem)
+
+class Conflito(ErroEscrita, sqlite3.IntegrityError):
+    # violação de UNIQUE/FOREIGN KEY/CHECK: repetir não adianta
+    pass
+
+_fila_escrita = queue.Queue()
+_escritor = {'thread': None, 'conn': None, 'geracao': None}
+_escritor_lock = threading.Lock()
+
+def _ocupado(erro):
+    if not isinstance(erro, sqlite3.OperationalError):
+        return False
+    nome = getattr(erro, 'sqlite_errorname', '')
+    return nome.startswith(('SQLITE_BUSY', 'SQLITE_LOCKED')) or 'locked' in str(erro)
+
+def _tipado(erro):
+    if isinstance(erro, sqlite3.IntegrityError) and not isinstance(erro, Conflito):
+        tipado = Conflito(str(erro))
+    elif _ocupado(erro) and not isinstance(erro, BancoOcupado):
+        tipado = BancoOcupado()
+    else:
+        return erro
+    tipado.__cause__ = erro
+    return tipado
+
+def escrever(func, *args):
+    # roda func(conn, *args) na thread de escrita, dentro de uma transação, e devolve o
+    # resultado; erros voltam como Conflito, BancoOcupado ou a exceção original
+    if threading.current_thread() is _escritor['thread']:
+        raise RuntimeError("escrever() chamado de dentro de outra gravação")
+    _iniciar_escritor()
+    pedido = Future()
+    _fila_escrita.put((func, args, pedido))
+    return pedido.result()
+
+def _iniciar_escritor():
+    with _escritor_lock:
+        if _escritor['thread'] is None or not _escritor['thread'].is_alive():
+            _escritor['thread'] = threading.Thread(target=_laco_escritor, name='escritor_sqlite', daemon=True)
+            _escritor['thread'].start()
+
+def _conexao_escritor():
+    # conexão própria, refeita depois de fechar_conexoes()/configurar()
+    if _escritor['conn'] is None or _escritor['geracao'] != _geracao_conexoes:
+        if _escritor['conn'] is not None:
+            _escritor['conn'].close()
+        conn = _nova_conexao()
+        conn.execute(f'PRAGMA busy_timeout={BUSY_ESCRITOR_MS}')
+        _escritor.update(conn=conn, geracao=_geracao_conexoes)
+    return _escritor['conn']
+
+def _laco_escritor():
+    proxima_poda = time.monotonic() + PODA_EXCLUSOES_S
+    while True:
+        pedidos = [_fila_escrita.get()]
+        while len(pedidos) < LOTE_ESCRITA:
+            try:
+                pedidos.append(_fila_escrita.get_nowait())
+            except queue.Empty:
+                break
+        _gravar_lote(pedidos)
+        if time.monotonic() >= proxima_poda:
+            _gravar_lote([(_podar_exclusoes, (), Future())])
+            proxima_poda = time.monotonic() + PODA_EXCLUSOES_S
+
+def _gravar_lote(pedidos):
+    for tentativa in range(TENTATIVAS_ESCRITA):
+        try:
+            resultados = _transacao_lote(pedidos)
+        except Exception as erro:
+            if _ocupado(erro) and tentativa < TENTATIVAS_ESCRITA - 1:
+                time.sleep(ESPERA_ESCRITA_S * 2 ** tentativa * random.uniform(0.5, 1.5))
+                continue
+            resultados = [(None, erro)] * len(pedidos)
+        for (_, _, pedido), (resultado, erro) in zip(pedidos, resultados):
+            if erro is None:
+                pedido.set_result(resultado)
+            else:
+                pedido.set_exception(_tipado(erro))
+        return
+
+def _transacao_lote(pedidos):
+    conn = _conexao_escritor()
+    savepoint = len(pedidos) > 1  # pedido sozinho: o ROLLBACK da transação já basta
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        resultados = []
+        for func, args, _ in pedidos:
+            if savepoint:
+                conn.execute('SAVEPOINT pedido')
+            try:
+                resultados.append((func(conn, *args), None))
+            except Exception as erro:
+                if _ocupado(erro) or not savepoint:
+                    raise  # ocupado: o lote inteiro é repetido
+                conn.execute('ROLLBACK TO pedido')
+                resultados.append((None, erro))
+            if savepoint:
+                conn.execute('RELEASE pedido')
+        conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return resultados
+
+def _executar(conn, sql, params=()):
+    return conn.execute(sql, params).rowcount
+
+def _executar_varios(conn, sql, lista):
+    return conn.executemany(sql, lista).rowcount
+
+# BANCO DE DADOS - MIGRAÇÕES VERSIONADAS (PRAGMA user_version)
+# Cada migração roda uma única vez, dentro da sua própria transação; a posição
+# na lista MIGRACOES é o número da versão. Novas alterações de esquema entram
+# sempre no fim da lista.
+def _m001_esquema_inicial(c):
+    # USUÁRIOS
+    c.execute('''CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        senha TEXT NOT NULL,
+        nivel TEXT DEFAULT 'operador',
+        data_cadastro TEXT
+    )''')
+
+    # LAVAGENS
+    c.execute('''CREATE TABLE IF NOT EXISTS lavagens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        numero_ordem TEXT UNIQUE,
+        placa TEXT NOT NULL,
+        motorista TEXT,
+        operacao TEXT,
+        data TEXT,
+        hora_inicio TEXT,
+        hora_fim TEXT,
+        status TEXT DEFAULT 'Pendente',
+        observacoes TEXT,
+        usuario_criacao TEXT,
+        foto_path TEXT
+    )''')
+
+    # VEÍCULOS
+    c.execute('''CREATE TABLE IF NOT EXISTS veiculos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        placa TEXT UNIQUE NOT NULL,
+        tipo TEXT NOT NULL,
+        modelo_marca TEXT,
+        data_cadastro TEXT
+    )''')
+
+    # FORNECEDORES
+    c.execute('''CREATE TABLE IF NOT EXISTS fornecedores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        lavador TEXT NOT NULL,
+        cnpj TEXT UNIQUE NOT NULL,
+        endereco TEXT,
+        data_cadastro TEXT
+    )''')
+
+    # TABELA DE PREÇOS
+    c.execute('''CREATE TABLE IF NOT EXISTS precos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fornecedor_id INTEGER,
+        tipo_veiculo TEXT NOT NULL,
+        servico TEXT NOT NULL,
+        valor REAL NOT NULL,
+        FOREIGN KEY (fornecedor_id) REFERENCES fornecedores (id) ON DELETE CASCADE
+    )''')
+
+    # ADICIONAR COLUNAS SE NÃO EXISTIREM
+    c.execute('PRAGMA table_info(lavagens)')
+    cols = [col[1] for col in c.fetchall()]
+    if 'status' not in cols:
+        c.execute('ALTER TABLE lavagens ADD COLUMN status TEXT DEFAULT "Pendente"')
+    if 'foto_path' not in cols:
+        c.execute('ALTER TABLE lavagens ADD COLUMN foto_path TEXT')
+
+    # ADMIN PADRÃO
+    c.execute('INSERT OR IGNORE INTO usuarios (nome, email, senha, nivel, data_cadastro) VALUES (?, ?, ?, ?, ?)',
+              ('Admin FSJ', 'admin@fsj.com', 'fsj123', 'admin', datetime.now().strftime('%d/%m/%Y %H:%M')))
+
+def _m002_indices(c):
+    # PREÇOS DUPLICADOS: mantém o mais recente antes de criar o índice único
+    c.execute('''DELETE FROM precos WHERE id NOT IN (
+        SELECT MAX(id) FROM precos GROUP BY fornecedor_id, tipo_veiculo, servico
+    )''')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_precos_forn_tipo_serv ON precos (fornecedor_id, tipo_veiculo, servico)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_lavagens_data ON lavagens (data)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_lavagens_status_data ON lavagens (status, data)')
+
+def _m003_sequencia_ordens(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS sequencia_ordens (
+        data TEXT PRIMARY KEY,
+        ultimo INTEGER NOT NULL
+    ) WITHOUT ROWID''')
+    # continua a partir do maior número já emitido em cada dia (ORD-AAAAMMDD-NNN)
+    c.execute('''INSERT OR REPLACE INTO sequencia_ordens (data, ultimo)
+        SELECT data, MAX(CAST(substr(numero_ordem, 14) AS INTEGER)) FROM lavagens
+        WHERE numero_ordem LIKE 'ORD-________-%' AND data IS NOT NULL
+        GROUP BY data''')
+
+# OBSERVAÇÕES ANTIGAS: "Lavador: X | Valor: R$10.00 | Frota: Sim | PX: Não | texto livre"
+_RE_OBS_LEGADO = re.compile(r"^Lavador: (.*?) \| Valor: R\$([\d.,]+) \| Frota: (Sim|Não) \| PX: (Sim|Não) \| ?(.*)$", re.S)
+LOTE_BACKFILL = 1000
+
+def _m004_colunas_estruturadas(c):
+    c.execute('PRAGMA table_info(lavagens)')
+    cols = [col[1] for col in c.fetchall()]
+    novas = {
+        'fornecedor_id': 'INTEGER REFERENCES fornecedores (id) ON DELETE SET NULL',
+        'tipo_veiculo': 'TEXT',
+        'servico': 'TEXT',
+        'valor_centavos': 'INTEGER',
+        'frota': 'INTEGER NOT NULL DEFAULT 0',
+        'px': 'INTEGER NOT NULL DEFAULT 0',
+    }
+    for nome, tipo in novas.items():
+        if nome not in cols:
+            c.execute(f'ALTER TABLE lavagens ADD COLUMN {nome} {tipo}')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_lavagens_fornecedor_data ON lavagens (fornecedor_id, data)')
+
+    # BACKFILL EM LOTES: interpreta operacao/observacoes das ordens já emitidas
+    ids_fornecedor = {}
+    for forn_id, lavador in c.execute('SELECT id, lavador FROM fornecedores ORDER BY id DESC').fetchall():
+        ids_fornecedor[lavador] = forn_id
+    ultimo_id = 0
+    while True:
+        lote = c.execute('SELECT id, operacao, observacoes FROM lavagens WHERE id > ? ORDER BY id LIMIT ?',
+                         (ultimo_id, LOTE_BACKFILL)).fetchall()
+        if not lote:
+            break
+        ultimo_id = lote[-1][0]
+        updates = []
+        for id_lav, operacao, observacoes in lote:
+            tipo_veiculo, _, servico = (operacao or "").partition(" - ")
+            fornecedor_id = valor_centavos = None
+            frota = px = 0
+            m = _RE_OBS_LEGADO.match(observacoes or "")
+            if m:
+                fornecedor_id = ids_fornecedor.get(m.group(1))
+                valor_centavos = round(float(m.group(2).replace(",", ".")) * 100)
+                frota, px = int(m.group(3) == "Sim"), int(m.group(4) == "Sim")
+                observacoes = _texto_livre_legado(m, fornecedor_id, observacoes)
+            updates.append((fornecedor_id, tipo_veiculo or None, servico or None, valor_centavos, frota, px,
+                            observacoes, id_lav))
+        c.executemany('''UPDATE lavagens SET fornecedor_id=?, tipo_veiculo=?, servico=?, valor_centavos=?, frota=?, px=?,
+            observacoes=? WHERE id=?''', updates)
+
+def _texto_livre_legado(m, fornecedor_id, observacoes):
+    # só o texto livre fica em observacoes; se o lavador não está no cadastro,
+    # o texto antigo inteiro fica (é o único lugar com o nome dele)
+    return m.group(5) if fornecedor_id or not m.group(1) else observacoes
+
+# RESUMO DIÁRIO: dia x fornecedor x tipo x serviço x status -> qtd, total.
+# Mantido pelos triggers abaixo; fornecedor 0 e textos vazios = não identificado.
+_CHAVE_RESUMO_NEW = "NEW.data, COALESCE(NEW.fornecedor_id, 0), COALESCE(NEW.tipo_veiculo, ''), COALESCE(NEW.servico, ''), COALESCE(NEW.status, '')"
+_FILTRO_RESUMO_OLD = '''data = OLD.data AND fornecedor_id = COALESCE(OLD.fornecedor_id, 0)
+    AND tipo_veiculo = COALESCE(OLD.tipo_veiculo, '') AND servico = COALESCE(OLD.servico, '')
+    AND status = COALESCE(OLD.status, '')'''
+_SOMA_RESUMO_NEW = f'''INSERT INTO resumo_diario (data, fornecedor_id, tipo_veiculo, servico, status, qtd, total_centavos)
+    VALUES ({_CHAVE_RESUMO_NEW}, 1, COALESCE(NEW.valor_centavos, 0))
+    ON CONFLICT (data, fornecedor_id, tipo_veiculo, servico, status) DO UPDATE
+    SET qtd = qtd + 1, total_centavos = total_centavos + excluded.total_centavos;'''
+_SUBTRAI_RESUMO_OLD = f'''UPDATE resumo_diario SET qtd = qtd - 1, total_centavos = total_centavos - COALESCE(OLD.valor_centavos, 0)
+    WHERE {_FILTRO_RESUMO_OLD};
+    DELETE FROM resumo_diario WHERE qtd <= 0 AND {_FILTRO_RESUMO_OLD};'''
+
+def _m005_resumo_diario(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS resumo_diario (
+        data TEXT NOT NULL,
+        fornecedor_id INTEGER NOT NULL,
+        tipo_veiculo TEXT NOT NULL,
+        servico TEXT NOT NULL,
+        status TEXT NOT NULL,
+        qtd INTEGER NOT NULL,
+        total_centavos INTEGER NOT NULL,
+        PRIMARY KEY (data, fornecedor_id, tipo_veiculo, servico, status)
+    ) WITHOUT ROWID''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_resumo_insert AFTER INSERT ON lavagens BEGIN
+        {_SOMA_RESUMO_NEW}
+    END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_resumo_delete AFTER DELETE ON lavagens BEGIN
+        {_SUBTRAI_RESUMO_OLD}
+    END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_resumo_update
+        AFTER UPDATE OF data, fornecedor_id, tipo_veiculo, servico, status, valor_centavos ON lavagens BEGIN
+        {_SUBTRAI_RESUMO_OLD}
+        {_SOMA_RESUMO_NEW}
+    END''')
+    _reconstruir_resumo(c)
+
+def _reconstruir_resumo(c):
+    c.execute('DELETE FROM resumo_diario')
+    c.execute('''INSERT INTO resumo_diario (data, fornecedor_id, tipo_veiculo, servico, status, qtd, total_centavos)
+        SELECT data, COALESCE(fornecedor_id, 0), COALESCE(tipo_veiculo, ''), COALESCE(servico, ''), COALESCE(status, ''),
+               COUNT(*), COALESCE(SUM(valor_centavos), 0)
+        FROM lavagens WHERE data IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5''')
+
+# VERSÃO DOS DADOS DE REFERÊNCIA: qualquer escrita (de qualquer processo) incrementa
+# o contador da tabela, invalidando o cache_versionado de todos os workers
+TABELAS_VERSIONADAS = ['veiculos', 'fornecedores', 'precos']
+
+def _m006_versao_dados(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS versao_dados (
+        tabela TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL
+    ) WITHOUT ROWID''')
+    for tabela in TABELAS_VERSIONADAS:
+        c.execute('INSERT OR IGNORE INTO versao_dados (tabela, versao) VALUES (?, 0)', (tabela,))
+        for evento in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela}_{evento.lower()} AFTER {evento} ON {tabela} BEGIN
+                UPDATE versao_dados SET versao = versao + 1 WHERE tabela = '{tabela}';
+            END''')
+
+# DATAS DE CADASTRO EM ISO-8601: 'dd/mm/aaaa HH:MM' -> 'aaaa-mm-dd HH:MM:SS',
+# ordenável e indexável; a formatação dd/mm/aaaa fica só na tela
+TABELAS_CADASTRO = ['usuarios', 'veiculos', 'fornecedores']
+
+def _m007_datas_iso(c):
+    for tabela in TABELAS_CADASTRO:
+        c.execute(f'''UPDATE {tabela} SET data_cadastro =
+            substr(data_cadastro, 7, 4) || '-' || substr(data_cadastro, 4, 2) || '-' || substr(data_cadastro, 1, 2) || ' ' ||
+            CASE WHEN length(data_cadastro) >= 16 THEN substr(data_cadastro, 12, 5) || ':00' ELSE '00:00:00' END
+            WHERE data_cadastro GLOB '[0-3][0-9]/[01][0-9]/[0-9][0-9][0-9][0-9]*' ''')
+        c.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_data_cadastro ON {tabela} (data_cadastro)')
+
+    # LAVAGENS: momento da criação e da última alteração; as antigas herdam a data da ordem
+    c.execute('PRAGMA table_info(lavagens)')
+    cols = [col[1] for col in c.fetchall()]
+    for nome in ('created_at', 'updated_at'):
+        if nome not in cols:
+            c.execute(f'ALTER TABLE lavagens ADD COLUMN {nome} TEXT')
+    c.execute('''UPDATE lavagens SET created_at = data || ' 00:00:00', updated_at = data || ' 00:00:00'
+        WHERE created_at IS NULL AND data IS NOT NULL''')
+
+# BUSCA TEXTUAL: tabelas FTS5 com conteúdo externo (o texto fica só na tabela
+# original), mantidas em sincronia por triggers
+BUSCA_FTS = {
+    'lavagens': ['numero_ordem', 'placa', 'motorista', 'observacoes'],
+    'veiculos': ['placa', 'modelo_marca'],
+    'fornecedores': ['lavador', 'cnpj', 'endereco'],
+}
+
+def _m008_busca_textual(c):
+    for tabela, colunas in BUSCA_FTS.items():
+        fts = f'busca_{tabela}'
+        lista = ', '.join(colunas)
+        novos = ', '.join(f'NEW.{col}' for col in colunas)
+        antigos = ', '.join(f'OLD.{col}' for col in colunas)
+        c.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({lista}, content='{tabela}', content_rowid='id',
+            prefix='2 3', tokenize='unicode61 remove_diacritics 2')''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {fts} (rowid, {lista}) VALUES (NEW.id, {novos});
+        END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {lista}) VALUES ('delete', OLD.id, {antigos});
+        END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {lista} ON {tabela} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {lista}) VALUES ('delete', OLD.id, {antigos});
+            INSERT INTO {fts} (rowid, {lista}) VALUES (NEW.id, {novos});
+        END''')
+        c.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+# VEÍCULOS DE CADA ORDEM: a placa da ordem continua como texto ("CAVALO + REBOQUE1 + REBOQUE2"),
+# e o vínculo com o cadastro fica em lavagem_veiculos para o histórico por veículo usar índice
+POSICOES_VEICULO = ['cavalo', 'reboque1', 'reboque2']
+
+def placas_da_ordem(placa):
+    return [p.strip().upper() for p in (placa or "").split('+') if p.strip()]
+
+def _m009_lavagem_veiculos(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS lavagem_veiculos (
+        lavagem_id INTEGER NOT NULL REFERENCES lavagens (id) ON DELETE CASCADE,
+        veiculo_id INTEGER NOT NULL REFERENCES veiculos (id) ON DELETE CASCADE,
+        posicao TEXT NOT NULL,
+        PRIMARY KEY (lavagem_id, posicao)
+    ) WITHOUT ROWID''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_lavagem_veiculos_veiculo ON lavagem_veiculos (veiculo_id, lavagem_id)')
+
+    # BACKFILL EM LOTES: separa as placas das ordens já emitidas (placas fora do cadastro ficam sem vínculo)
+    ids_veiculo = dict(c.execute('SELECT placa, id FROM veiculos').fetchall())
+    ultimo_id = 0
+    while True:
+        lote = c.execute('SELECT id, placa FROM lavagens WHERE id > ? ORDER BY id LIMIT ?',
+                         (ultimo_id, LOTE_BACKFILL)).fetchall()
+        if not lote:
+            break
+        ultimo_id = lote[-1][0]
+        c.executemany('INSERT OR IGNORE INTO lavagem_veiculos (lavagem_id, veiculo_id, posicao) VALUES (?, ?, ?)',
+                      [(id_lav, ids_veiculo[placa], posicao)
+                       for id_lav, placas in lote
+                       for posicao, placa in zip(POSICOES_VEICULO, placas_da_ordem(placas))
+                       if placa in ids_veiculo])
+
+# VERSÃO DAS LINHAS (feed de mudanças): cada linha guarda a versão da sua tabela
+# (versao_dados) na última gravação, e cada exclusão deixa o id em exclusoes.
+# "O que mudou desde a versão V" vira uma faixa no índice de versao.
+TABELAS_FEED = ['lavagens', 'veiculos', 'fornecedores', 'precos']
+
+def _m010_versao_linhas(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS exclusoes (
+        tabela TEXT NOT NULL,
+        versao INTEGER NOT NULL,
+        id INTEGER NOT NULL,
+        PRIMARY KEY (tabela, versao)
+    ) WITHOUT ROWID''')
+    for tabela in TABELAS_FEED:
+        c.execute(f'PRAGMA table_info({tabela})')
+        if 'versao' not in [col[1] for col in c.fetchall()]:
+            c.execute(f'ALTER TABLE {tabela} ADD COLUMN versao INTEGER NOT NULL DEFAULT 0')
+        c.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_versao ON {tabela} (versao)')
+        c.execute('INSERT OR IGNORE INTO versao_dados (tabela, versao) VALUES (?, 0)', (tabela,))
+        # substitui os triggers da _m006: o contador continua subindo uma vez por linha gravada
+        for evento in ('insert', 'update', 'delete'):
+            c.execute(f'DROP TRIGGER IF EXISTS trg_versao_{tabela}_{evento}')
+        proxima = f"UPDATE versao_dados SET versao = versao + 1 WHERE tabela = '{tabela}';"
+        carimbo = f"UPDATE {tabela} SET versao = (SELECT versao FROM versao_dados WHERE tabela = '{tabela}') WHERE id = NEW.id;"
+        c.execute(f'''CREATE TRIGGER trg_versao_{tabela}_insert AFTER INSERT ON {tabela} BEGIN
+            {proxima}
+            {carimbo}
+        END''')
+        # o carimbo muda versao, então não dispara este trigger de novo
+        c.execute(f'''CREATE TRIGGER trg_versao_{tabela}_update AFTER UPDATE ON {tabela} WHEN NEW.versao = OLD.versao BEGIN
+            {proxima}
+            {carimbo}
+        END''')
+        c.execute(f'''CREATE TRIGGER trg_versao_{tabela}_delete AFTER DELETE ON {tabela} BEGIN
+            {proxima}
+            INSERT INTO exclusoes (tabela, versao, id) SELECT '{tabela}', versao, OLD.id FROM versao_dados WHERE tabela = '{tabela}';
+        END''')
+
+def _m011_observacoes_legadas(c):
+    # bancos que passaram pela _m004 quando ela ainda não limpava observacoes
+    ultimo_id = 0
+    while True:
+        lote = c.execute('''SELECT id, fornecedor_id, observacoes FROM lavagens
+            WHERE id > ? AND observacoes LIKE 'Lavador: %' ORDER BY id LIMIT ?''', (ultimo_id, LOTE_BACKFILL)).fetchall()
+        if not lote:
+            break
+        ultimo_id = lote[-1][0]
+        updates = []
+        for id_lav, fornecedor_id, observacoes in lote:
+            m = _RE_OBS_LEGADO.match(observacoes)
+            if m:
+                updates.append((_texto_livre_legado(m, fornecedor_id, observacoes), id_lav))
+        c.executemany('UPDATE lavagens SET observacoes = ? WHERE id = ?', updates)
+
+# PODA DAS EXCLUSÕES: versao_dados.exclusoes_ate guarda até que versão as exclusões
+# já foram removidas; quem pede mudanças desde antes disso precisa recarregar tudo
+def _m012_poda_exclusoes(c):
+    c.execute('PRAGMA table_info(versao_dados)')
+    if 'exclusoes_ate' not in [col[1] for col in c.fetchall()]:
+        c.execute('ALTER TABLE versao_dados ADD COLUMN exclusoes_ate INTEGER NOT NULL DEFAULT 0')
+
+MIGRACOES = [
+    _m001_esquema_inicial,
+    _m002_indices,
+    _m003_sequencia_ordens,
+    _m004_colunas_estruturadas,
+    _m005_resumo_diario,
+    _m006_versao_dados,
+    _m007_datas_iso,
+    _m008_busca_textual,
+    _m009_lavagem_veiculos,
+    _m010_versao_linhas,
+    _m011_observacoes_legadas,
+    _m012_poda_exclusoes,
+]
+
+_migrado = False
+_migracao_lock = threading.Lock()
+
+def versao_esquema():
+    with conexao() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrar():
+    with conexao() as conn:
+        for numero, migracao in enumerate(MIGRACOES, start=1):
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= numero:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # outro processo pode ter aplicado a migração enquanto esperávamos o lock
+                if conn.execute('PRAGMA user_version').fetchone()[0] < numero:
+                    migracao(conn.cursor())
+                    conn.execute(f'PRAGMA user_version = {numero}')
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+def init_db():
+    # chamado a cada rerun do Streamlit: depois da primeira vez no processo não toca no banco
+    global _migrado
+    if _migrado:
+        return
+    with _migracao_lock:
+        if not _migrado:
+            migrar()
+            podar_exclusoes()
+            _migrado = True
+
+# CACHE DE DADOS DE REFERÊNCIA: o resultado fica em memória até a versão das
+# tabelas mudar; cada leitura custa só a consulta em versao_dados
+CACHE_MAX_CHAVES = 32  # combinações de argumentos guardadas por função (as menos usadas saem)
+_cache = {}
+_caches = []  # um OrderedDict por função com @cache_versionado
+_cache_lock = threading.Lock()
+
+def versao_tabelas(*tabelas):
+    with conexao() as conn:
+        versoes = dict(conn.execute('SELECT tabela, versao FROM versao_dados'))
+    return tuple(versoes.get(t, 0) for t in tabelas)
+
+def cache_versionado(*tabelas, max_chaves=CACHE_MAX_CHAVES):
+    def decorador(func):
+        itens = OrderedDict()  # args -> (versao, valor), do menos para o mais usado
+        _caches.append(itens)
+        @functools.wraps(func)
+        def wrapper(*args):
+            versao = versao_tabelas(*tabelas)
+            with _cache_lock:
+                item = itens.get(args)
+                if item is not None and item[0] == versao:
+                    itens.move_to_end(args)
+                    return item[1]
+            valor = func(*args)
+            with _cache_lock:
+                # versão nova: os resultados das versões anteriores não servem mais
+                for antigos in [a for a, (v, _) in itens.items() if v != versao]:
+                    del itens[antigos]
+                itens[args] = (versao, valor)
+                while len(itens) > max_chaves:
+                    itens.popitem(last=False)
+            return valor
+        wrapper.sem_cache = func
+        return wrapper
+    return decorador
+
+def limpar_cache():
+    with _cache_lock:
+        _cache.clear()
+        for itens in _caches:
+            itens.clear()
+
+# === FUNÇÕES USUÁRIOS ===
+# gravações de cadastro devolvem (ok, mensagem): conflito e banco ocupado têm mensagens próprias
+def criar_usuario(nome, email, senha, nivel):
+    data_cad = agora()
+    try:
+        escrever(_executar, 'INSERT INTO usuarios (nome, email, senha, nivel, data_cadastro) VALUES (?, ?, ?, ?, ?)',
+                 (nome, email, senha, nivel, data_cad))
+        return True, "OK"
+    except Conflito:
+        return False, "E-mail já existe"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def editar_usuario(id_usuario, nome, email, senha, nivel):
+    try:
+        if senha:
+            escrever(_executar, 'UPDATE usuarios SET nome=?, email=?, senha=?, nivel=? WHERE id=?',
+                     (nome, email, senha, nivel, int(id_usuario)))
+        else:
+            escrever(_executar, 'UPDATE usuarios SET nome=?, email=?, nivel=? WHERE id=?',
+                     (nome, email, nivel, int(id_usuario)))
+        return True, "OK"
+    except Conflito:
+        return False, "E-mail já existe"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def excluir_usuario(id_usuario):
+    try:
+        escrever(_executar, 'DELETE FROM usuarios WHERE id = ?', (int(id_usuario),))
+        return True, "OK"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def validar_login(email, senha):
+    with conexao() as conn:
+        return conn.execute('SELECT nome, nivel FROM usuarios WHERE email = ? AND senha = ?', (email, senha)).fetchone()
+
+def listar_usuarios():
+    with conexao() as conn:
+        return pd.read_sql_query('SELECT id, nome, email, senha, nivel, data_cadastro FROM usuarios ORDER BY data_cadastro DESC', conn)
+
+# === VALIDAÇÃO (mesmas regras no cadastro manual e na importação) ===
+RE_PLACA = re.compile(r"^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$")
+
+def normalizar_placa(placa):
+    # placa no formato ABC1D23 ou None se inválida
+    placa = (placa or "").upper().replace("-", "").replace(" ", "")
+    return placa if len(placa) == 7 and RE_PLACA.match(placa) else None
+
+def normalizar_cnpj(cnpj):
+    # só os 14 dígitos ou None se inválido
+    cnpj = re.sub(r'\D', '', cnpj or "")
+    return cnpj if len(cnpj) == 14 else None
+
+def valor_positivo(valor):
+    # aceita número ou texto ("150", "150.5", "1.250,00"); None se não for > 0
+    if isinstance(valor, str):
+        valor = valor.replace("R$", "").strip()
+        if "," in valor:
+            valor = valor.replace(".", "").replace(",", ".")
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return valor if valor > 0 else None
+
+# === FUNÇÕES VEÍCULOS ===
+def criar_veiculo(placa, tipo, modelo_marca):
+    placa = normalizar_placa(placa)
+    if placa is None:
+        return False, "Placa inválida"
+    if tipo not in TIPOS_VEICULO:
+        return False, "Tipo inválido"
+    data_cad = agora()
+    try:
+        escrever(_executar, 'INSERT INTO veiculos (placa, tipo, modelo_marca, data_cadastro) VALUES (?, ?, ?, ?)',
+                 (placa, tipo, modelo_marca or "", data_cad))
+        return True, "OK"
+    except Conflito:
+        return False, "Placa já cadastrada"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def editar_veiculo(id_veiculo, placa, tipo, modelo_marca):
+    placa = normalizar_placa(placa)
+    if placa is None:
+        return False, "Placa inválida"
+    if tipo not in TIPOS_VEICULO:
+        return False, "Tipo inválido"
+    try:
+        escrever(_executar, 'UPDATE veiculos SET placa = ?, tipo = ?, modelo_marca = ? WHERE id = ?',
+                 (placa, tipo, modelo_marca or "", int(id_veiculo)))
+        return True, "OK"
+    except Conflito:
+        return False, "Placa já cadastrada"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def excluir_veiculo(id_veiculo):
+    try:
+        escrever(_executar, 'DELETE FROM veiculos WHERE id = ?', (int(id_veiculo),))
+        return True, "OK"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def listar_veiculos():
+    return instantaneo('veiculos', ['data_cadastro', 'id'])
+
+# ÍNDICE DE PLACAS EM MEMÓRIA: listas ordenadas (busca por prefixo com bisect),
+# uma por processo e compartilhada entre as sessões; refeita só quando veiculos muda
+TIPOS_REBOQUE = ["REBOQUE", "PRANCHA"]
+SUGESTOES_PLACA = 20
+
+@cache_versionado('veiculos')
+def indice_placas():
+    with conexao() as conn:
+        linhas = conn.execute('SELECT placa, tipo FROM veiculos ORDER BY placa').fetchall()
+    return {'todas': [placa for placa, _ in linhas],
+            'reboques': [placa for placa, tipo in linhas if tipo in TIPOS_REBOQUE],
+            'tipo': dict(linhas)}
+
+def sugerir_placas(prefixo, reboque=False, limite=SUGESTOES_PLACA):
+    # até `limite` placas começando com o prefixo, em ordem alfabética
+    placas = indice_placas()['reboques' if reboque else 'todas']
+    prefixo = (prefixo or "").upper().replace("-", "").replace(" ", "")
+    inicio = bisect.bisect_left(placas, prefixo)
+    # ordenadas: as que casam com o prefixo são contíguas a partir de `inicio`
+    return [placa for placa in placas[inicio:inicio + limite] if placa.startswith(prefixo)]
+
+def tipo_veiculo_placa(placa):
+    return indice_placas()['tipo'].get(placa)
+
+# === FUNÇÕES FORNECEDORES ===
+def criar_fornecedor(lavador, cnpj, endereco):
+    cnpj = normalizar_cnpj(cnpj)
+    if cnpj is None:
+        return False, "CNPJ inválido"
+    data_cad = agora()
+    try:
+        fornecedor_id = escrever(lambda conn: conn.execute(
+            'INSERT INTO fornecedores (lavador, cnpj, endereco, data_cadastro) VALUES (?, ?, ?, ?)',
+            (lavador, cnpj, endereco or "", data_cad)).lastrowid)
+        return True, fornecedor_id
+    except Conflito:
+        return False, "CNPJ já cadastrado"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def editar_fornecedor(id_forn, lavador, cnpj, endereco):
+    cnpj = normalizar_cnpj(cnpj)
+    if cnpj is None:
+        return False, "CNPJ inválido"
+    try:
+        escrever(_executar, 'UPDATE fornecedores SET lavador=?, cnpj=?, endereco=? WHERE id=?',
+                 (lavador, cnpj, endereco or "", int(id_forn)))
+        return True, "OK"
+    except Conflito:
+        return False, "CNPJ já cadastrado"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def excluir_fornecedor(id_forn):
+    try:
+        escrever(_executar, 'DELETE FROM fornecedores WHERE id = ?', (int(id_forn),))
+        return True, "OK"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def listar_fornecedores():
+    return instantaneo('fornecedores', ['data_cadastro', 'id'])
+
+# === CADASTROS POR PERÍODO (faixa no índice de data_cadastro) ===
+def _sql_contar_cadastros(tabela, inicio, fim):
+    if tabela not in TABELAS_CADASTRO:
+        raise ValueError(f"Tabela inválida: {tabela}")
+    return f'SELECT COUNT(*) FROM {tabela} WHERE data_cadastro >= ? AND data_cadastro < ?', [str(inicio), str(fim)]
+
+def contar_cadastros(tabela, inicio, fim):
+    # inicio incluído, fim excluído (datas ou textos ISO)
+    sql, params = _sql_contar_cadastros(tabela, inicio, fim)
+    with conexao() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+# === FUNÇÕES PREÇOS ===
+def adicionar_preco(fornecedor_id, tipo_veiculo, servico, valor):
+    valor = valor_positivo(valor)
+    if valor is None or tipo_veiculo not in TIPOS_VEICULO or servico not in SERVICOS:
+        return False, "Tipo, serviço ou valor inválido"
+    try:
+        escrever(_executar, '''INSERT INTO precos (fornecedor_id, tipo_veiculo, servico, valor) VALUES (?, ?, ?, ?)
+            ON CONFLICT (fornecedor_id, tipo_veiculo, servico) DO UPDATE SET valor = excluded.valor''',
+                 (int(fornecedor_id), tipo_veiculo, servico, valor))
+        return True, "OK"
+    except Conflito:
+        return False, "Fornecedor não encontrado"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def editar_preco(id_preco, tipo_veiculo, servico, valor):
+    valor = valor_positivo(valor)
+    if valor is None or tipo_veiculo not in TIPOS_VEICULO or servico not in SERVICOS:
+        return False, "Tipo, serviço ou valor inválido"
+    try:
+        escrever(_executar, 'UPDATE precos SET tipo_veiculo=?, servico=?, valor=? WHERE id=?',
+                 (tipo_veiculo, servico, valor, int(id_preco)))
+        return True, "OK"
+    except Conflito:
+        return False, "Já existe preço para esse tipo e serviço"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def excluir_preco(id_preco):
+    try:
+        escrever(_executar, 'DELETE FROM precos WHERE id = ?', (int(id_preco),))
+        return True, "OK"
+    except BancoOcupado as erro:
+        return False, str(erro)
+
+def listar_precos_por_fornecedor(fornecedor_id):
+    return _listar_precos_por_fornecedor(int(fornecedor_id))
+
+_SELECT_PRECOS_FORNECEDOR = 'SELECT id, tipo_veiculo, servico, valor FROM precos WHERE fornecedor_id = ? ORDER BY tipo_veiculo, servico'
+
+@cache_versionado('precos')
+def _listar_precos_por_fornecedor(fornecedor_id):
+    with conexao() as conn:
+        return pd.read_sql_query(_SELECT_PRECOS_FORNECEDOR, conn, params=(fornecedor_id,))
+
+# ÍNDICE DE PREÇOS EM MEMÓRIA: fornecedor_id -> tipo -> serviço -> valor,
+# reconstruído só quando precos/fornecedores mudam de versão
+@cache_versionado('precos', 'fornecedores')
+def indice_precos():
+    with conexao() as conn:
+        fornecedores = conn.execute('SELECT id, lavador FROM fornecedores ORDER BY lavador, id DESC').fetchall()
+        linhas = conn.execute('SELECT fornecedor_id, tipo_veiculo, servico, valor FROM precos ORDER BY tipo_veiculo, servico').fetchall()
+    lavador_por_id = dict(fornecedores)
+    id_por_lavador = {}
+    for forn_id, lavador in fornecedores:
+        id_por_lavador.setdefault(lavador, forn_id)
+    precos = {}
+    mais_barato = {}
+    for forn_id, tipo, servico, valor in linhas:
+        precos.setdefault(forn_id, {}).setdefault(tipo, {})[servico] = valor
+        atual = mais_barato.get((tipo, servico))
+        if atual is None or valor < atual[1]:
+            mais_barato[(tipo, servico)] = (forn_id, valor)
+    return {'precos': precos, 'mais_barato': mais_barato,
+            'lavador_por_id': lavador_por_id, 'id_por_lavador': id_por_lavador}
+
+def id_fornecedor(lavador):
+    return indice_precos()['id_por_lavador'].get(lavador)
+
+def servicos_disponiveis(lavador, tipo_veiculo):
+    # {serviço: valor} do lavador (nome ou id) para o tipo de veículo
+    indice = indice_precos()
+    forn_id = lavador if isinstance(lavador, int) else indice['id_por_lavador'].get(lavador)
+    return indice['precos'].get(forn_id, {}).get(tipo_veiculo, {})
+
+def fornecedor_mais_barato(tipo_veiculo, servico):
+    # (fornecedor_id, lavador, valor) ou None
+    indice = indice_precos()
+    achado = indice['mais_barato'].get((tipo_veiculo, servico))
+    if achado is None:
+        return None
+    forn_id, valor = achado
+    return forn_id, indice['lavador_por_id'].get(forn_id), valor
+
+# === IMPORTAÇÃO EM LOTE ===
+# linhas: dicts vindos do CSV (chaves em minúsculas). Tudo é validado antes e
+# gravado com um único executemany numa transação; linhas inválidas não entram
+# e voltam no relatório como (linha, mensagem), com a linha 1 sendo o cabeçalho.
+def _campo(linha, *nomes):
+    for nome in nomes:
+        valor = linha.get(nome)
+        if valor is not None and str(valor).strip():
+            return str(valor).strip()
+    return ""
+
+def _linhas_numeradas(linhas):
+    # numeração do arquivo, pulando linhas em branco
+    for n, linha in enumerate(linhas, start=2):
+        if any(str(v).strip() for v in linha.values() if v is not None):
+            yield n, linha
+
+def importar_veiculos(linhas):
+    validas, erros = {}, []
+    for n, linha in _linhas_numeradas(linhas):
+        placa = normalizar_placa(_campo(linha, 'placa'))
+        tipo = _campo(linha, 'tipo', 'tipo_veiculo').upper()
+        if placa is None:
+            erros.append((n, f"Placa inválida: {_campo(linha, 'placa')!r}"))
+        elif tipo not in TIPOS_VEICULO:
+            erros.append((n, f"Tipo inválido: {tipo!r}"))
+        else:
+            validas[placa] = (placa, tipo, _campo(linha, 'modelo_marca', 'modelo')[:30])
+    data_cad = agora()
+    escrever(_executar_varios, '''INSERT INTO veiculos (placa, tipo, modelo_marca, data_cadastro) VALUES (?, ?, ?, ?)
+        ON CONFLICT (placa) DO UPDATE SET tipo = excluded.tipo, modelo_marca = excluded.modelo_marca''',
+             [v + (data_cad,) for v in validas.values()])
+    return len(validas), erros
+
+def importar_fornecedores(linhas):
+    validas, erros = {}, []
+    for n, linha in _linhas_numeradas(linhas):
+        cnpj = normalizar_cnpj(_campo(linha, 'cnpj'))
+        lavador = _campo(linha, 'lavador', 'nome')
+        if cnpj is None:
+            erros.append((n, f"CNPJ inválido: {_campo(linha, 'cnpj')!r}"))
+        elif not lavador:
+            erros.append((n, "Lavador não informado"))
+        else:
+            validas[cnpj] = (lavador, cnpj, _campo(linha, 'endereco'))
+    data_cad = agora()
+    escrever(_executar_varios, '''INSERT INTO fornecedores (lavador, cnpj, endereco, data_cadastro) VALUES (?, ?, ?, ?)
+        ON CONFLICT (cnpj) DO UPDATE SET lavador = excluded.lavador, endereco = excluded.endereco''',
+             [v + (data_cad,) for v in validas.values()])
+    return len(validas), erros
+
+def importar_precos(linhas):
+    # o fornecedor vem pelo CNPJ (preferido) ou pelo nome do lavador
+    with conexao() as conn:
+        fornecedores = conn.execute('SELECT id, lavador, cnpj FROM fornecedores ORDER BY id DESC').fetchall()
+    id_por_cnpj = {cnpj: forn_id for forn_id, _, cnpj in fornecedores}
+    id_por_lavador = {}
+    for forn_id, lavador, _ in fornecedores:
+        id_por_lavador.setdefault(lavador, forn_id)
+    validas, erros = {}, []
+    for n, linha in _linhas_numeradas(linhas):
+        cnpj = normalizar_cnpj(_campo(linha, 'cnpj'))
+        forn_id = id_por_cnpj.get(cnpj) if cnpj else id_por_lavador.get(_campo(linha, 'lavador', 'fornecedor'))
+        tipo = _campo(linha, 'tipo_veiculo', 'tipo').upper()
+        servico = _campo(linha, 'servico').upper()
+        valor = valor_positivo(_campo(linha, 'valor'))
+        if forn_id is None:
+            erros.append((n, "Fornecedor não encontrado"))
+        elif tipo not in TIPOS_VEICULO:
+            erros.append((n, f"Tipo inválido: {tipo!r}"))
+        elif servico not in SERVICOS:
+            erros.append((n, f"Serviço inválido: {servico!r}"))
+        elif valor is None:
+            erros.append((n, f"Valor inválido: {_campo(linha, 'valor')!r}"))
+        else:
+            validas[(forn_id, tipo, servico)] = (forn_id, tipo, servico, valor)
+    escrever(_executar_varios, '''INSERT INTO precos (fornecedor_id, tipo_veiculo, servico, valor) VALUES (?, ?, ?, ?)
+        ON CONFLICT (fornecedor_id, tipo_veiculo, servico) DO UPDATE SET valor = excluded.valor''',
+             list(validas.values()))
+    return len(validas), erros
+
+# === FUNÇÕES LAVAGENS ===
+# NÚMERO DA ORDEM: sequência por dia em sequencia_ordens, incrementada com
+# UPSERT ... RETURNING dentro da mesma transação do INSERT (O(1), sem COUNT)
+_RESERVAR_SEQUENCIA = '''INSERT INTO sequencia_ordens (data, ultimo) VALUES (?, ?)
+    ON CONFLICT (data) DO UPDATE SET ultimo = ultimo + excluded.ultimo
+    RETURNING ultimo'''
+
+def _reservar_numeros(conn, data, qtd):
+    ultimo = conn.execute(_RESERVAR_SEQUENCIA, (data, qtd)).fetchone()[0]
+    prefixo = f"ORD-{data.replace('-', '')}-"
+    return [f"{prefixo}{n:03d}" for n in range(ultimo - qtd + 1, ultimo + 1)]
+
+def emitir_ordens(ordens):
+    # ordens: lista de dicts com os mesmos argumentos de emitir_ordem
+    if not ordens:
+        return []
+    return escrever(_gravar_ordens, ordens)
+
+def _gravar_ordens(conn, ordens):
+    momento = agora()
+    data_hoje = momento[:10]
+    numeros = _reservar_numeros(conn, data_hoje, len(ordens))
+    conn.executemany('''INSERT INTO lavagens
+    (numero_ordem, placa, motorista, operacao, data, hora_inicio, hora_fim, observacoes, status, usuario_criacao, foto_path,
+     fornecedor_id, tipo_veiculo, servico, valor_centavos, frota, px, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+    [(numero, o['placa'].upper(), o.get('motorista'), o.get('operacao') or _operacao(o), data_hoje,
+      o.get('hora_inicio', ""), o.get('hora_fim', ""), o.get('obs'), o.get('status', "Pendente"), o.get('usuario'),
+      o.get('foto_path'), _int_ou_none(o.get('fornecedor_id')), o.get('tipo_veiculo'), o.get('servico'),
+      _int_ou_none(o.get('valor_centavos')), int(bool(o.get('frota'))), int(bool(o.get('px'))), momento, momento)
+     for numero, o in zip(numeros, ordens)])
+    conn.executemany('''INSERT OR IGNORE INTO lavagem_veiculos (lavagem_id, veiculo_id, posicao)
+        SELECT l.id, v.id, ? FROM lavagens l JOIN veiculos v ON v.placa = ? WHERE l.numero_ordem = ?''',
+    [(posicao, placa, numero)
+     for numero, o in zip(numeros, ordens)
+     for posicao, placa in zip(POSICOES_VEICULO, placas_da_ordem(o['placa']))])
+    return numeros
+
+def emitir_ordem(placa, motorista, operacao, hora_inicio, hora_fim, obs, usuario, status="Pendente", foto_path=None,
+                 fornecedor_id=None, tipo_veiculo=None, servico=None, valor_centavos=None, frota=False, px=False):
+    return emitir_ordens([dict(placa=placa, motorista=motorista, operacao=operacao, hora_inicio=hora_inicio,
+                               hora_fim=hora_fim, obs=obs, usuario=usuario, status=status, foto_path=foto_path,
+                               fornecedor_id=fornecedor_id, tipo_veiculo=tipo_veiculo, servico=servico,
+                               valor_centavos=valor_centavos, frota=frota, px=px)])[0]
+
+def _operacao(ordem):
+    if ordem.get('tipo_veiculo') and ordem.get('servico'):
+        return f"{ordem['tipo_veiculo']} - {ordem['servico']}"
+    return None
+
+def _int_ou_none(valor):
+    return None if valor is None else int(valor)
+
+def centavos(valor):
+    return round(float(valor) * 100)
+
+# STATUS: hora_inicio é carimbada ao passar para "Em Andamento" e hora_fim ao
+# passar para "Concluída"; ordens que já estão no status pedido não são tocadas
+def _set_status(status):
+    if status not in STATUS_LAVAGEM:
+        raise ValueError(f"Status inválido: {status}")
+    carimbo = {'Em Andamento': ', hora_inicio = ?', 'Concluída': ', hora_fim = ?'}.get(status, '')
+    momento = datetime.now()
+    params = [status, momento.strftime('%Y-%m-%d %H:%M:%S')] + ([momento.strftime('%H:%M')] if carimbo else [])
+    return 'SET status = ?, updated_at = ?' + carimbo, params
+
+def atualizar_status(numero_ordem, status):
+    return atualizar_status_lote([numero_ordem], status)
+
+def atualizar_status_lote(numeros_ordem, status):
+    # uma transação e um executemany para todas as ordens selecionadas
+    return escrever(_executar_varios, *_sql_status_lote(status, numeros_ordem))
+
+def _sql_status_lote(status, numeros_ordem):
+    set_sql, params = _set_status(status)
+    return (f'UPDATE lavagens {set_sql} WHERE numero_ordem = ? AND status <> ?',
+            [params + [numero, status] for numero in numeros_ordem])
+
+def _sql_status_filtrados(novo_status, **filtros):
+    set_sql, params = _set_status(novo_status)
+    where, params_where = _filtros_lavagens(**filtros)
+    return (f'UPDATE lavagens {set_sql} WHERE status <> ? AND id IN (SELECT l.id FROM lavagens l{where})',
+            params + [novo_status] + params_where)
+
+def atualizar_status_filtrados(novo_status, data_inicio=None, data_fim=None, status=None, placa=None, fornecedor_id=None):
+    # "todas as filtradas": um único UPDATE com os mesmos filtros da lista
+    return escrever(_executar, *_sql_status_filtrados(novo_status, data_inicio=data_inicio, data_fim=data_fim,
+                                                      status=status, placa=placa, fornecedor_id=fornecedor_id))
+
+_UPDATE_FOTO = 'UPDATE lavagens SET foto_path = ?, updated_at = ? WHERE numero_ordem = ?'
+
+def atualizar_foto(numero_ordem, foto_path):
+    escrever(_executar, _UPDATE_FOTO, (foto_path, agora(), numero_ordem))
+
+def obter_lavagem(numero_ordem):
+    with conexao() as conn:
+        c = conn.execute(SELECT_LAVAGENS + ' WHERE l.numero_ordem = ?', (numero_ordem,))
+        row = c.fetchone()
+        if row is None:
+            return None
+        return dict(zip([col[0] for col in c.description], row))
+
+def listar_lavagens():
+    with conexao() as conn:
+        return pd.read_sql_query('SELECT * FROM lavagens ORDER BY data DESC', conn)
+
+# CONTROLE: filtros no SQL + paginação por chave (data, id), sem OFFSET
+SELECT_LAVAGENS = '''SELECT l.*, f.lavador, l.valor_centavos / 100.0 AS valor
+    FROM lavagens l LEFT JOIN fornecedores f ON f.id = l.fornecedor_id'''
+
+def _filtros_lavagens(data_inicio=None, data_fim=None, status=None, placa=None, fornecedor_id=None, apos=None):
+    where, params = [], []
+    if data_inicio:
+        where.append('l.data >= ?')
+        params.append(str(data_inicio))
+    if data_fim:
+        where.append('l.data <= ?')
+        params.append(str(data_fim))
+    if status:
+        where.append('l.status = ?')
+        params.append(status)
+    if placa:
+        where.append('l.placa LIKE ?')
+        params.append(f"%{placa.upper().replace('-', '').strip()}%")
+    if fornecedor_id:
+        where.append('l.fornecedor_id = ?')
+        params.append(int(fornecedor_id))
+    if apos:
+        # apos = (data, id) da última linha da página anterior
+        where.append('(l.data, l.id) < (?, ?)')
+        params.extend([apos[0], int(apos[1])])
+    return (' WHERE ' + ' AND '.join(where) if where else ''), params
+
+def _sql_buscar_lavagens(limite=None, **filtros):
+    where, params = _filtros_lavagens(**filtros)
+    sql = SELECT_LAVAGENS + where + ' ORDER BY l.data DESC, l.id DESC'
+    if limite:
+        sql += ' LIMIT ?'
+        params.append(limite)
+    return sql, params
+
+def _sql_contar_lavagens(**filtros):
+    where, params = _filtros_lavagens(**filtros)
+    return 'SELECT COUNT(*) FROM lavagens l' + where, params
+
+def buscar_lavagens(data_inicio=None, data_fim=None, status=None, placa=None, fornecedor_id=None, apos=None, limite=50):
+    sql, params = _sql_buscar_lavagens(limite, data_inicio=data_inicio, data_fim=data_fim, status=status, placa=placa,
+                                       fornecedor_id=fornecedor_id, apos=apos)
+    with conexao() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+def contar_lavagens(data_inicio=None, data_fim=None, status=None, placa=None, fornecedor_id=None):
+    sql, params = _sql_contar_lavagens(data_inicio=data_inicio, data_fim=data_fim, status=status, placa=placa,
+                                       fornecedor_id=fornecedor_id)
+    with conexao() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+def iterar_lavagens(data_inicio=None, data_fim=None, status=None, placa=None, fornecedor_id=None, lote=500):
+    # percorre o resultado filtrado em páginas por chave, um dict por ordem;
+    # a conexão volta ao pool entre uma página e outra
+    apos = None
+    while True:
+        sql, params = _sql_buscar_lavagens(lote, data_inicio=data_inicio, data_fim=data_fim, status=status, placa=placa,
+                                           fornecedor_id=fornecedor_id, apos=apos)
+        with conexao() as conn:
+            c = conn.execute(sql, params)
+            colunas = [col[0] for col in c.description]
+            linhas = c.fetchall()
+        if not linhas:
+            return
+        for linha in linhas:
+            yield dict(zip(colunas, linha))
+        ultima = dict(zip(colunas, linhas[-1]))
+        apos = (ultima['data'], ultima['id'])
+
+# === FEED DE MUDANÇAS (versao > V pelo índice de versao; exclusões em exclusoes) ===
+# quem guarda um instantâneo pergunta versao_tabelas() a cada rerun (uma consulta)
+# e, se mudou, busca só as linhas gravadas/excluídas depois da versão que já tem
+_SELECT_FEED = {
+    'lavagens': SELECT_LAVAGENS + ' WHERE l.versao > ?',
+    'veiculos': 'SELECT id, placa, tipo, modelo_marca, data_cadastro FROM veiculos WHERE versao > ?',
+    'fornecedores': 'SELECT id, lavador, cnpj, endereco, data_cadastro FROM fornecedores WHERE versao > ?',
+    'precos': 'SELECT id, fornecedor_id, tipo_veiculo, servico, valor FROM precos WHERE versao > ?',
+}
+_SELECT_EXCLUSOES = 'SELECT id FROM exclusoes WHERE tabela = ? AND versao > ?'
+RETENCAO_EXCLUSOES = 10000  # versões de cada tabela com exclusões guardadas
+
+def _podar_exclusoes(conn):
+    # exclusões mais antigas que a janela de retenção saem; exclusoes_ate marca o corte
+    removidas = 0
+    for tabela in TABELAS_FEED:
+        limite = conn.execute('SELECT versao - ? FROM versao_dados WHERE tabela = ?',
+                              (RETENCAO_EXCLUSOES, tabela)).fetchone()[0]
+        removidas += conn.execute('DELETE FROM exclusoes WHERE tabela = ? AND versao <= ?', (tabela, limite)).rowcount
+        conn.execute('UPDATE versao_dados SET exclusoes_ate = MAX(exclusoes_ate, ?) WHERE tabela = ?', (limite, tabela))
+    return removidas
+
+def podar_exclusoes():
+    return escrever(_podar_exclusoes)
+
+def _ler_mudancas(tabela, sql, params, desde, filtrado=False):
+    # versão, linhas e exclusões lidas no mesmo instantâneo do banco
+    with conexao() as conn:
+        conn.execute('BEGIN')
+        versao, podado = conn.execute('SELECT versao, exclusoes_ate FROM versao_dados WHERE tabela = ?',
+                                      (tabela,)).fetchone()
+        # exclusões depois de "desde" já podadas: o delta ficaria incompleto
+        mudanca = {'versao': versao, 'recarregar': 0 <= desde < podado}
+        if not mudanca['recarregar']:
+            linhas = pd.read_sql_query(sql, conn, params=params)
+            excluidos = [i for (i,) in conn.execute(_SELECT_EXCLUSOES, (tabela, desde))]
+            if filtrado:
+                alteradas = [i for (i,) in conn.execute(f'SELECT id FROM {tabela} WHERE versao > ?', (desde,))]
+            else:
+                alteradas = linhas['id'].tolist()
+            mudanca.update(linhas=linhas, excluidos=excluidos, alteradas=alteradas)
+        conn.commit()
+    return mudanca
+
+def mudancas(tabela, desde=-1):
+    # {'versao', 'recarregar', 'linhas' (DataFrame), 'excluidos' (ids), 'alteradas' (ids)}; desde=-1 traz tudo.
+    # recarregar=True (sem as demais chaves): desde é anterior à poda das exclusões
+    if tabela not in _SELECT_FEED:
+        raise ValueError(f"Tabela sem feed: {tabela}")
+    return _ler_mudancas(tabela, _SELECT_FEED[tabela], (desde,), desde)
+
+def mudancas_lavagens(desde, data_inicio=None, data_fim=None, status=None, placa=None, fornecedor_id=None):
+    # como mudancas('lavagens'), mas 'linhas' só traz as que passam nos filtros do controle;
+    # 'alteradas' tem todas, para saber quais saíram do filtro
+    sql, params = _sql_mudancas_lavagens(desde, data_inicio=data_inicio, data_fim=data_fim, status=status, placa=placa,
+                                         fornecedor_id=fornecedor_id)
+    return _ler_mudancas('lavagens', sql, params, desde, filtrado=True)
+
+def _sql_mudancas_lavagens(desde, **filtros):
+    where, params = _filtros_lavagens(**filtros)
+    return SELECT_LAVAGENS + (where + ' AND' if where else ' WHERE') + ' l.versao > ?', params + [desde]
+
+def mesclar(df, mudanca, ordem):
+    # aplica as mudanças sobre o instantâneo anterior (chave: id) e reordena (decrescente)
+    fora = set(mudanca['excluidos']) | set(mudanca['alteradas'])
+    df = df[~df['id'].isin(fora)]
+    if len(mudanca['linhas']):
+        df = pd.concat([df, mudanca['linhas']], ignore_index=True) if len(df) else mudanca['linhas']
+    return df.sort_values(ordem, ascending=False, ignore_index=True)
+
+def mesclar_pagina(df, mudanca, apos, limite):
+    # página do controle (até limite+1 linhas em data/id decrescente) atualizada no lugar.
+    # Devolve (df, recontar) ou None quando a mudança mexe nos limites e a página precisa ser relida
+    if mudanca['recarregar']:
+        return None
+    na_pagina = set(df['id'])
+    linhas = mudanca['linhas']
+    if na_pagina & set(mudanca['excluidos']):
+        return None
+    if (na_pagina & set(mudanca['alteradas'])) - set(linhas['id']):
+        return None  # saiu do filtro
+    antes = df.set_index('id')['data'].to_dict()
+    ultima = (df['data'].iloc[-1], int(df['id'].iloc[-1])) if len(df) > limite else None
+    for id_lav, data in zip(linhas['id'], linhas['data']):
+        if id_lav in na_pagina:
+            if antes[id_lav] != data:
+                return None  # mudou de posição
+        elif (apos is None or (data, id_lav) < (apos[0], int(apos[1]))) and (ultima is None or (data, id_lav) > ultima):
+            return None  # entrou na faixa desta página
+    # o total só muda por linha de fora da página (nova, excluída ou que entrou/saiu do filtro)
+    recontar = bool(mudanca['excluidos']) or bool(set(mudanca['alteradas']) - na_pagina)
+    dentro = linhas[linhas['id'].isin(na_pagina)]
+    mudanca = {'linhas': dentro, 'alteradas': dentro['id'].tolist(), 'excluidos': []}
+    return mesclar(df, mudanca, ['data', 'id']), recontar
+
+def instantaneo(tabela, ordem):
+    # lista inteira da tabela, uma por processo: recarregada só com o que mudou
+    versao = versao_tabelas(tabela)[0]
+    atual = _cache.get(('instantaneo', tabela))
+    if atual is not None and atual[0] == versao:
+        return atual[1]
+    mudanca = mudancas(tabela, atual[0]) if atual is not None else None
+    if mudanca is None or mudanca['recarregar']:
+        mudanca = mudancas(tabela)
+        df = mudanca['linhas'].sort_values(ordem, ascending=False, ignore_index=True)
+    else:
+        df = mesclar(atual[1], mudanca, ordem)
+    with _cache_lock:
+        _cache[('instantaneo', tabela)] = (mudanca['versao'], df)
+    return df
+
+# === BUSCA TEXTUAL (FTS5, ordenada por relevância) ===
+_SELECT_BUSCA = {
+    'lavagens': '''SELECT l.id, l.numero_ordem, l.data, l.placa, l.motorista, l.status, f.lavador
+        FROM achados a JOIN lavagens l ON l.id = a.rowid LEFT JOIN fornecedores f ON f.id = l.fornecedor_id''',
+    'veiculos': 'SELECT v.id, v.placa, v.tipo, v.modelo_marca FROM achados a JOIN veiculos v ON v.id = a.rowid',
+    'fornecedores': 'SELECT f.id, f.lavador, f.cnpj, f.endereco FROM achados a JOIN fornecedores f ON f.id = a.rowid',
+}
+
+def consulta_fts(texto):
+    # cada palavra vira um prefixo; palavras com pontuação ("ORD-20250101-001",
+    # "12.345.678/0001-90") casam tanto como frase quanto emendadas num token só
+    termos = []
+    for palavra in (texto or "").split():
+        partes = re.findall(r'\w+', palavra)
+        if len(partes) == 1:
+            termos.append(f'"{partes[0]}"*')
+        elif partes:
+            termos.append(f'("{" ".join(partes)}"* OR "{"".join(partes)}"*)')
+    return ' '.join(termos)
+
+def _sql_buscar_texto(tabela, consulta, limite):
+    fts = f'busca_{tabela}'
+    return (f'''WITH achados AS (SELECT rowid, rank FROM {fts} WHERE {fts} MATCH ? ORDER BY rank LIMIT ?)
+        {_SELECT_BUSCA[tabela]} ORDER BY a.rank''', [consulta, limite or -1])
+
+def buscar_texto(tabela, texto, limite=20):
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return pd.DataFrame()
+    sql, params = _sql_buscar_texto(tabela, consulta, limite)
+    with conexao() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+def busca_global(texto, limite=20):
+    return {tabela: buscar_texto(tabela, texto, limite) for tabela in BUSCA_FTS}
+
+# === HISTÓRICO POR VEÍCULO (lavagem_veiculos -> lavagens, pelo índice do veículo) ===
+# o valor é o da ordem inteira: num conjunto, cada placa "participa" do total
+_SELECT_HISTORICO = '''SELECT l.numero_ordem, l.data, lv.posicao, l.placa, l.servico, f.lavador,
+        l.valor_centavos / 100.0 AS valor, l.status
+    FROM lavagem_veiculos lv JOIN lavagens l ON l.id = lv.lavagem_id
+    LEFT JOIN fornecedores f ON f.id = l.fornecedor_id
+    WHERE lv.veiculo_id = ? ORDER BY l.data DESC, l.id DESC LIMIT ?'''
+
+def historico_veiculo(veiculo_id, recentes=20):
+    veiculo_id = int(veiculo_id)
+    with conexao() as conn:
+        totais = conn.execute('''SELECT COUNT(*), COALESCE(SUM(l.valor_centavos), 0) / 100.0, MAX(l.data)
+            FROM lavagem_veiculos lv JOIN lavagens l ON l.id = lv.lavagem_id WHERE lv.veiculo_id = ?''',
+                              (veiculo_id,)).fetchone()
+        por_mes = pd.read_sql_query('''SELECT substr(l.data, 1, 7) AS mes, COUNT(*) AS lavagens,
+                COALESCE(SUM(l.valor_centavos), 0) / 100.0 AS total
+            FROM lavagem_veiculos lv JOIN lavagens l ON l.id = lv.lavagem_id WHERE lv.veiculo_id = ?
+            GROUP BY mes ORDER BY mes''', conn, params=(veiculo_id,))
+        ultimas = pd.read_sql_query(_SELECT_HISTORICO, conn, params=(veiculo_id, recentes))
+    return {'lavagens': totais[0], 'total': totais[1], 'ultima': totais[2], 'por_mes': por_mes, 'ultimas': ultimas}
+
+# === RELATÓRIOS (lidos só do resumo_diario; em cache até lavagens mudar de versão) ===
+def reconstruir_resumo():
+    escrever(lambda conn: _reconstruir_resumo(conn.cursor()))
+    limpar_cache()
+
+@cache_versionado('lavagens')
+def anos_com_lavagens():
+    with conexao() as conn:
+        anos = [int(r[0]) for r in conn.execute('''SELECT DISTINCT substr(data, 1, 4) FROM resumo_diario
+            WHERE data IS NOT NULL ORDER BY 1 DESC''')]
+    return anos or [datetime.now().year]
+
+def _filtro_resumo(data_inicio, data_fim, status):
+    sql = 'WHERE r.data >= ? AND r.data <= ?'
+    params = [str(data_inicio), str(data_fim)]
+    if status:
+        sql += ' AND r.status = ?'
+        params.append(status)
+    return sql, params
+
+def _sql_resumo_por_fornecedor(data_inicio, data_fim, status=None):
+    where, params = _filtro_resumo(data_inicio, data_fim, status)
+    return f'''SELECT COALESCE(f.lavador, 'Não identificado') AS Lavador,
+            SUM(r.qtd) AS Ordens, SUM(r.total_centavos) / 100.0 AS Valor
+        FROM resumo_diario r LEFT JOIN fornecedores f ON f.id = r.fornecedor_id
+        {where}
+        GROUP BY r.fornecedor_id ORDER BY Ordens DESC''', params
+
+def _sql_resumo_por_servico(data_inicio, data_fim, status=None):
+    where, params = _filtro_resumo(data_inicio, data_fim, status)
+    return f'''SELECT r.tipo_veiculo AS Tipo, r.servico AS Serviço,
+            SUM(r.qtd) AS Ordens, SUM(r.total_centavos) / 100.0 AS Valor
+        FROM resumo_diario r {where}
+        GROUP BY r.tipo_veiculo, r.servico ORDER BY Ordens DESC''', params
+
+@cache_versionado('lavagens', 'fornecedores')
+def resumo_por_fornecedor(data_inicio, data_fim, status=None):
+    sql, params = _sql_resumo_por_fornecedor(data_inicio, data_fim, status)
+    with conexao() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+@cache_versionado('lavagens')
+def resumo_por_servico(data_inicio, data_fim, status=None):
+    sql, params = _sql_resumo_por_servico(data_inicio, data_fim, status)
+    with conexao() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+# === DIAGNÓSTICO: PLANO DAS CONSULTAS PRINCIPAIS ===
+# montadas pelas mesmas funções que o app usa, com valores de exemplo
+_DIA, _MES = ('2025-01-01', '2025-01-31'), ('2025-01-01', '2025-02-01')
+_APOS = ('2025-01-01', 1)
+CONSULTAS_PRINCIPAIS = {
+    "Sequência diária (emitir_ordens)": (_RESERVAR_SEQUENCIA, (_DIA[0], 1)),
+    "Página do controle (buscar_lavagens)": _sql_buscar_lavagens(51, apos=_APOS),
+    "Página do controle por período": _sql_buscar_lavagens(51, data_inicio=_DIA[0], data_fim=_DIA[1], apos=_APOS),
+    "Página do controle por status": _sql_buscar_lavagens(51, status='Pendente', apos=_APOS),
+    "Página do controle por lavador": _sql_buscar_lavagens(51, fornecedor_id=1, apos=_APOS),
+    "Página do controle por placa (LIKE '%...%')": _sql_buscar_lavagens(51, placa='ABC', apos=_APOS),
+    "Total do controle (contar_lavagens)": _sql_contar_lavagens(),
+    "Total do controle por status": _sql_contar_lavagens(status='Pendente'),
+    "Total do controle por placa": _sql_contar_lavagens(placa='ABC'),
+    "Exportação em lote (iterar_lavagens)": _sql_buscar_lavagens(500, status='Pendente', apos=_APOS),
+    "Status de uma ordem (atualizar_status)": (lambda sql, linhas: (sql, linhas[0]))(
+        *_sql_status_lote('Concluída', ['ORD-20250101-001'])),
+    "Status de todas filtradas (atualizar_status_filtrados)": _sql_status_filtrados('Concluída', status='Pendente'),
+    "Mudanças do controle (mudancas_lavagens)": _sql_mudancas_lavagens(0, status='Pendente'),
+    "Mudanças da tabela (mudancas / listar_veiculos)": (_SELECT_FEED['veiculos'], (0,)),
+    "Exclusões desde a versão (mudancas)": (_SELECT_EXCLUSOES, ('veiculos', 0)),
+    "Relatório por lavador (resumo_por_fornecedor)": _sql_resumo_por_fornecedor(*_DIA),
+    "Relatório por serviço (resumo_por_servico)": _sql_resumo_por_servico(*_DIA, 'Concluída'),
+    "Foto da ordem (atualizar_foto)": (_UPDATE_FOTO, ('static/fotos/x.jpg', _DIA[0], 'ORD-20250101-001')),
+    "Veículos cadastrados no mês (contar_cadastros)": _sql_contar_cadastros('veiculos', *_MES),
+    "Busca textual (buscar_texto)": _sql_buscar_texto('lavagens', consulta_fts('ABC1D23'), 20),
+    "Histórico do veículo (historico_veiculo)": (_SELECT_HISTORICO, (1, 20)),
+    "Preços do fornecedor (listar_precos_por_fornecedor)": (_SELECT_PRECOS_FORNECEDOR, (1,)),
+}
+
+def plano_consultas():
+    resultado = []
+    with conexao() as conn:
+        for nome, (sql, params) in CONSULTAS_PRINCIPAIS.items():
+            plano = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+            # "SCAN tabela" sem índice = leitura da tabela inteira (CTE materializada e FTS não contam)
+            ctes = {d.split()[1] for d in plano if d.startswith('MATERIALIZE')}
+            ctes |= {apelido for cte in ctes for apelido in re.findall(rf'\b{cte}\s+(\w+)', sql)}
+            varredura = any(d.startswith('SCAN') and 'INDEX' not in d and d.split()[1] not in ctes for d in plano)
+            temp = any('TEMP B-TREE' in d for d in plano)
+            # UPSERT pela chave primária não gera linhas de plano
+            resultado.append({"Consulta": nome, "SQL": sql, "Plano": " | ".join(plano) or "-",
+                              "Varredura completa": varredura, "Ordenação temporária": temp})
+    return pd.DataFrame(resultado)
+
+# LINHA DE COMANDO: python db.py migrar | reconstruir-resumo
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Manutenção do banco FSJ Lavagens")
+    parser.add_argument('comando', choices=['migrar', 'reconstruir-resumo'])
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args()
+    configurar(args.db)
+    init_db()
+    if args.comando == 'reconstruir-resumo':
+        reconstruir_resumo()
+    print(f"OK - {args.db} na versão {versao_esquema()}")
@@ -0,0 +1,310 @@
+# desempenho.py - FSJ LAVAGENS: MEDIÇÃO DE DESEMPENHO (OPCIONAL)
+# Desligada por padrão. Ligada (FSJ_DESEMPENHO=1 ou pela página Desempenho), registra
+# cada comando SQL com duração e linhas, o tempo de cada página por rerun e os
+# tempos de PDF/fotos. Os últimos reruns ficam em memória; com FSJ_DESEMPENHO_LOG
+# cada rerun também vai para um arquivo JSON lines.
+# Desligada, as conexões são sqlite3.Connection comuns e os ganchos só testam ATIVO.
+import os
+import json
+import sqlite3
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+import pandas as pd
+import db
+
+ATIVO = False
+ARQUIVO_LOG = os.environ.get('FSJ_DESEMPENHO_LOG')
+MAX_RERUNS = 200
+MAX_EVENTOS_RERUN = 500
+MAX_EVENTOS_FUNDO = 1000
+
+_local = threading.local()
+_lock = threading.Lock()
+HISTORICO = deque(maxlen=MAX_RERUNS)   # reruns finalizados
+FUNDO = deque(maxlen=MAX_EVENTOS_FUNDO)  # consultas/tempos das threads de segundo plano
+
+def _ms(segundos):
+    return round(segundos * 1000, 3)
+
+# LIGAR / DESLIGAR (troca a fábrica das conexões novas e descarta as do pool)
+def ativar():
+    global ATIVO
+    ATIVO = True
+    db.FABRICA_CONEXAO = ConexaoMedida
+    db.fechar_conexoes()
+
+def desativar():
+    global ATIVO
+    ATIVO = False
+    db.FABRICA_CONEXAO = sqlite3.Connection
+    db.fechar_conexoes()
+
+# REGISTRO DOS EVENTOS
+def _destino(tipo, evento):
+    # rerun em andamento nesta thread; senão, segundo plano (pool de PDF/fotos etc.)
+    coleta = getattr(_local, 'coleta', None)
+    if coleta is not None:
+        coleta['ultimo'] = perf_counter()
+        if len(coleta[tipo]) < MAX_EVENTOS_RERUN:
+            coleta[tipo].append(evento)
+        return evento
+    evento['thread'] = threading.current_thread().name
+    evento['horario'] = db.agora()
+    with _lock:
+        FUNDO.append((tipo, evento))
+    _gravar_log({'tipo': tipo, **evento})
+    return evento
+
+def _registrar_consulta(sql, segundos, linhas):
+    return _destino('consultas', {'sql': ' '.join(sql.split()), 'ms': _ms(segundos), 'linhas': max(linhas, 0)})
+
+def _registrar_tempo(nome, segundos):
+    return _destino('tempos', {'nome': nome, 'ms': _ms(segundos)})
+
+# CONEXÃO / CURSOR MEDIDOS
+class CursorMedido(sqlite3.Cursor):
+    _evento = None
+
+    def _buscar(self, inicio, linhas):
+        # o tempo de leitura das linhas entra na conta da consulta que as produziu
+        if self._evento is not None:
+            self._evento['ms'] = round(self._evento['ms'] + _ms(perf_counter() - inicio), 3)
+            self._evento['linhas'] += linhas
+
+    def execute(self, sql, parametros=()):
+        inicio = perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._evento = _registrar_consulta(sql, perf_counter() - inicio, self.rowcount)
+
+    def executemany(self, sql, parametros):
+        inicio = perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            self._evento = _registrar_consulta(sql, perf_counter() - inicio, self.rowcount)
+
+    def fetchone(self):
+        inicio = perf_counter()
+        linha = super().fetchone()
+        self._buscar(inicio, linha is not None)
+        return linha
+
+    def fetchmany(self, size=None):
+        inicio = perf_counter()
+        linhas = super().fetchmany(self.arraysize if size is None else size)
+        self._buscar(inicio, len(linhas))
+        return linhas
+
+    def fetchall(self):
+        inicio = perf_counter()
+        linhas = super().fetchall()
+        self._buscar(inicio, len(linhas))
+        return linhas
+
+    def __next__(self):
+        inicio = perf_counter()
+        linha = super().__next__()
+        self._buscar(inicio, 1)
+        return linha
+
+class ConexaoMedida(sqlite3.Connection):
+    # Connection.execute não passa por cursor(); por isso os dois são refeitos aqui
+    def cursor(self, factory=None):
+        return super().cursor(factory or CursorMedido)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+# CRONÔMETROS (PDF, fotos, ...)
+@contextmanager
+def medir(nome):
+    if not ATIVO:
+        yield
+        return
+    inicio = perf_counter()
+    try:
+        yield
+    finally:
+        _registrar_tempo(nome, perf_counter() - inicio)
+
+def medido(nome):
+    def decorador(func):
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            if not ATIVO:
+                return func(*args, **kwargs)
+            inicio = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _registrar_tempo(nome, perf_counter() - inicio)
+        return envolvida
+    return decorador
+
+# RERUN DO STREAMLIT: iniciar no topo do app.py, pagina() antes do despacho e
+# finalizar_rerun() no fim. Um st.rerun() interrompe o script antes do fim; a
+# coleta aberta fica na sessão e é fechada como interrompida no rerun seguinte.
+def iniciar_rerun(sessao):
+    anterior = sessao.pop('_desempenho_coleta', None)
+    if anterior is not None and not anterior['fechada']:
+        _fechar(anterior, anterior['ultimo'], interrompido=True)
+    if not ATIVO:
+        _local.coleta = None
+        return
+    coleta = _nova_coleta(None, 'preparação')
+    sessao['_desempenho_coleta'] = coleta
+    _local.coleta = coleta
+
+def _nova_coleta(pagina, segmento):
+    inicio = perf_counter()
+    return {'horario': db.agora(), 'pagina': pagina, 'inicio': inicio, 'ultimo': inicio, 'fechada': False,
+            'segmentos': [[segmento, inicio]], 'consultas': [], 'tempos': []}
+
+def pagina(nome):
+    coleta = getattr(_local, 'coleta', None)
+    if coleta is not None:
+        coleta['pagina'] = nome
+        coleta['ultimo'] = perf_counter()
+        coleta['segmentos'].append(['página', coleta['ultimo']])
+
+def finalizar_rerun():
+    coleta = getattr(_local, 'coleta', None)
+    _local.coleta = None
+    if coleta is not None and not coleta['fechada']:
+        _fechar(coleta, perf_counter(), interrompido=False)
+
+@contextmanager
+def fragmento(nome):
+    # rerun só de um st.fragment: não passa pelo topo do app.py, então abre a própria coleta
+    if not ATIVO or getattr(_local, 'coleta', None) is not None:
+        yield
+        return
+    coleta = _nova_coleta(nome, 'fragmento')
+    _local.coleta = coleta
+    try:
+        yield
+    finally:
+        _fechar(coleta, perf_counter(), interrompido=False)
+
+def _fechar(coleta, fim, interrompido):
+    coleta['fechada'] = True
+    if getattr(_local, 'coleta', None) is coleta:
+        _local.coleta = None
+    marcas = coleta['segmentos'] + [[None, fim]]
+    registro = {
+        'horario': coleta['horario'],
+        'pagina': coleta['pagina'] or '-',
+        'ms': _ms(fim - coleta['inicio']),
+        'interrompido': interrompido,
+        'segmentos': {nome: _ms(marcas[i + 1][1] - inicio) for i, (nome, inicio) in enumerate(marcas[:-1])},
+        'sql_ms': round(sum(c['ms'] for c in coleta['consultas']), 3),
+        'consultas': coleta['consultas'],
+        'tempos': coleta['tempos'],
+    }
+    with _lock:
+        HISTORICO.append(registro)
+    _gravar_log({'tipo': 'rerun', **registro})
+
+def _gravar_log(registro):
+    if not ARQUIVO_LOG:
+        return
+    linha = json.dumps(registro, ensure_ascii=False, default=str) + '\n'
+    with _lock:
+        with open(ARQUIVO_LOG, 'a', encoding='utf-8') as f:
+            f.write(linha)
+
+def limpar():
+    with _lock:
+        HISTORICO.clear()
+        FUNDO.clear()
+
+def _instantaneo():
+    with _lock:
+        return list(HISTORICO), list(FUNDO)
+
+# RELATÓRIOS DA PÁGINA DESEMPENHO
+def _p95(serie):
+    return serie.quantile(0.95) if len(serie) else 0.0
+
+def tempo_por_pagina():
+    reruns, _ = _instantaneo()
+    colunas = ['Página', 'Reruns', 'Interrompidos', 'Média (ms)', 'p95 (ms)', 'Máx (ms)',
+               'SQL médio (ms)', 'Consultas/rerun']
+    if not reruns:
+        return pd.DataFrame(columns=colunas)
+    df = pd.DataFrame({
+        'pagina': [r['pagina'] for r in reruns],
+        'ms': [r['ms'] for r in reruns],
+        'sql_ms': [r['sql_ms'] for r in reruns],
+        'consultas': [len(r['consultas']) for r in reruns],
+        'interrompido': [r['interrompido'] for r in reruns],
+    })
+    resumo = df.groupby('pagina', as_index=False).agg(**{
+        'Reruns': ('ms', 'size'),
+        'Interrompidos': ('interrompido', 'sum'),
+        'Média (ms)': ('ms', 'mean'),
+        'p95 (ms)': ('ms', _p95),
+        'Máx (ms)': ('ms', 'max'),
+        'SQL médio (ms)': ('sql_ms', 'mean'),
+        'Consultas/rerun': ('consultas', 'mean'),
+    }).rename(columns={'pagina': 'Página'}).round(1)
+    return resumo.sort_values('p95 (ms)', ascending=False, ignore_index=True)[colunas]
+
+def _consultas():
+    reruns, fundo = _instantaneo()
+    linhas = [(r['horario'], r['pagina'], c) for r in reruns for c in r['consultas']]
+    linhas += [(e['horario'], 'segundo plano', e) for tipo, e in fundo if tipo == 'consultas']
+    return pd.DataFrame([{'Horário': h, 'Origem': origem, 'SQL': c['sql'], 'ms': c['ms'], 'Linhas': c['linhas']}
+                         for h, origem, c in linhas],
+                        columns=['Horário', 'Origem', 'SQL', 'ms', 'Linhas'])
+
+def consultas_mais_lentas(limite=20):
+    df = _consultas()
+    if df.empty:
+        return df
+    return df.nlargest(limite, 'ms').reset_index(drop=True)
+
+def consultas_agrupadas(limite=20):
+    # mesmo texto SQL (parâmetros fora) = mesma consulta
+    df = _consultas()
+    colunas = ['SQL', 'Execuções', 'Total (ms)', 'Média (ms)', 'Máx (ms)', 'Linhas']
+    if df.empty:
+        return pd.DataFrame(columns=colunas)
+    resumo = df.groupby('SQL', as_index=False).agg(**{
+        'Execuções': ('ms', 'size'),
+        'Total (ms)': ('ms', 'sum'),
+        'Média (ms)': ('ms', 'mean'),
+        'Máx (ms)': ('ms', 'max'),
+        'Linhas': ('Linhas', 'sum'),
+    }).round(2)
+    return resumo.nlargest(limite, 'Total (ms)').reset_index(drop=True)[colunas]
+
+def tempos_medidos():
+    reruns, fundo = _instantaneo()
+    eventos = [t for r in reruns for t in r['tempos']] + [e for tipo, e in fundo if tipo == 'tempos']
+    colunas = ['Etapa', 'Execuções', 'Média (ms)', 'p95 (ms)', 'Máx (ms)']
+    if not eventos:
+        return pd.DataFrame(columns=colunas)
+    return pd.DataFrame(eventos).groupby('nome', as_index=False).agg(**{
+        'Execuções': ('ms', 'size'),
+        'Média (ms)': ('ms', 'mean'),
+        'p95 (ms)': ('ms', _p95),
+        'Máx (ms)': ('ms', 'max'),
+    }).rename(columns={'nome': 'Etapa'}).round(1)[colunas]
+
+def exportar_jsonl():
+    # para o st.download_button: o que está em memória, no mesmo formato do FSJ_DESEMPENHO_LOG
+    reruns, fundo = _instantaneo()
+    linhas = [{'tipo': 'rerun', **r} for r in reruns] + [{'tipo': tipo, **e} for tipo, e in fundo]
+    return ''.join(json.dumps(l, ensure_ascii=False, default=str) + '\n' for l in linhas).encode('utf-8')
+
+if os.environ.get('FSJ_DESEMPENHO'):
+    ativar()
@@ -0,0 +1,61 @@
+# exportacao.py - FSJ LAVAGENS: EXPORTAÇÃO CSV
+# As linhas saem do banco em lotes e são escritas direto num arquivo temporário
+# (em memória até LIMITE_MEMORIA, depois em disco); nenhum DataFrame completo é montado.
+import io
+import csv
+import tempfile
+import db
+
+LOTE_CSV = 1000
+LIMITE_MEMORIA = 1024 * 1024
+
+# CADASTROS: mesmas colunas das listas mostradas nas páginas
+CONSULTAS_CSV = {
+    'funcionarios': 'SELECT nome, email, data_cadastro, nivel FROM usuarios ORDER BY data_cadastro DESC',
+    'veiculos': 'SELECT placa, tipo, modelo_marca, data_cadastro FROM veiculos ORDER BY data_cadastro DESC',
+    'fornecedores': 'SELECT id, lavador, cnpj, endereco, data_cadastro FROM fornecedores ORDER BY data_cadastro DESC',
+}
+
+# LAVAGENS: colunas que o financeiro usa
+CAMPOS_LAVAGENS = ['numero_ordem', 'data', 'placa', 'tipo_veiculo', 'operacao', 'lavador', 'servico', 'valor',
+                   'status', 'motorista', 'frota', 'px', 'hora_inicio', 'hora_fim', 'usuario_criacao', 'observacoes']
+
+def _escrever_csv(cabecalho, linhas):
+    # linhas: iterável de tuplas/listas; devolve o arquivo posicionado no início
+    saida = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA)
+    texto = io.TextIOWrapper(saida, encoding='utf-8', newline='')
+    writer = csv.writer(texto)
+    writer.writerow(cabecalho)
+    writer.writerows(linhas)
+    texto.flush()
+    texto.detach()
+    saida.seek(0)
+    return saida
+
+def _linhas_cursor(cursor):
+    while True:
+        lote = cursor.fetchmany(LOTE_CSV)
+        if not lote:
+            return
+        yield from lote
+
+def exportar_cadastro_csv(nome):
+    with db.conexao() as conn:
+        c = conn.execute(CONSULTAS_CSV[nome])
+        return _escrever_csv([col[0] for col in c.description], _linhas_cursor(c))
+
+def exportar_lavagens_csv(data_inicio=None, data_fim=None, status=None, placa=None, fornecedor_id=None):
+    # iterar_lavagens pagina por chave e devolve a conexão ao pool entre os lotes
+    ordens = db.iterar_lavagens(data_inicio, data_fim, status, placa, fornecedor_id, lote=LOTE_CSV)
+    return _escrever_csv(CAMPOS_LAVAGENS, ([ordem.get(campo) for campo in CAMPOS_LAVAGENS] for ordem in ordens))
+
+# PARA O st.download_button (data= callable: só gera quando o usuário clica)
+def _ler(arquivo):
+    with arquivo:
+        return arquivo.read()
+
+def csv_cadastro(nome):
+    return _ler(exportar_cadastro_csv(nome))
+
+def csv_lavagens(filtros):
+    return _ler(exportar_lavagens_csv(**filtros))
@@ -0,0 +1,17 @@
+# exportacao_pdf.py - FSJ LAVAGENS: PROCESSO DA EXPORTAÇÃO DE PDFs EM LOTE
+# Iniciado por pdf_ordem.exportar_pdfs. O pool de processos (spawn) parte deste
+# script, e não do app.py que o Streamlit instala como __main__.
+import sys
+import json
+import db
+import pdf_ordem
+
+def _progresso(feitos, total):
+    print(feitos, total, flush=True)
+
+if __name__ == '__main__':
+    pedido = json.loads(sys.argv[1])
+    db.configurar(pedido['db'])
+    pdf_ordem.PASTA_PDFS = pedido['pasta_pdfs']
+    pdf_ordem.gerar_exportacao(pedido['filtros'], pedido['formato'], pedido['saida'],
+                               pedido['processos'], _progresso)
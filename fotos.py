@@ -0,0 +1,89 @@
+# fotos.py - FSJ LAVAGENS: ARMAZENAMENTO DE FOTOS
+# Fotos guardadas pelo hash do conteúdo (uploads idênticos viram um arquivo só).
+# O original é gravado na hora; a versão de exibição e a miniatura (com a
+# orientação EXIF aplicada) são geradas em segundo plano.
+import os
+import hashlib
+from io import BytesIO
+from PIL import Image, ImageOps
+from arquivos import gravar, gravacao_atomica, agendador_unico
+from desempenho import medido
+
+PASTA_FOTOS = os.path.join('static', 'fotos')
+PASTA_ORIGINAIS = os.path.join(PASTA_FOTOS, 'originais')
+TAMANHO_EXIBICAO = 1600
+TAMANHO_MINIATURA = 320
+QUALIDADE_JPEG = 85
+
+_agendar = agendador_unico('fotos')
+
+def _caminhos(digest):
+    return {
+        'original': os.path.join(PASTA_ORIGINAIS, digest),
+        'exibicao': os.path.join(PASTA_FOTOS, f"{digest}.jpg"),
+        'miniatura': os.path.join(PASTA_FOTOS, f"{digest}_mini.jpg"),
+    }
+
+def _digest(foto_path):
+    # foto_path no formato novo: static/fotos/<sha256>.jpg
+    nome = os.path.basename(foto_path or "")
+    digest = nome[:-4] if nome.endswith('.jpg') else ""
+    return digest if len(digest) == 64 and all(ch in '0123456789abcdef' for ch in digest) else None
+
+def _salvar_jpeg(img, caminho, tamanho):
+    copia = img.copy()
+    copia.thumbnail((tamanho, tamanho))
+    with gravacao_atomica(caminho) as temporario:
+        copia.save(temporario, format='JPEG', quality=QUALIDADE_JPEG, optimize=True)
+
+@medido('Foto: redimensionar')
+def processar_foto(digest):
+    caminhos = _caminhos(digest)
+    if os.path.exists(caminhos['exibicao']) and os.path.exists(caminhos['miniatura']):
+        return caminhos['exibicao']
+    with Image.open(caminhos['original']) as img:
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        _salvar_jpeg(img, caminhos['exibicao'], TAMANHO_EXIBICAO)
+        _salvar_jpeg(img, caminhos['miniatura'], TAMANHO_MINIATURA)
+    return caminhos['exibicao']
+
+def _validar_imagem(dados):
+    # só o cabeçalho/estrutura: um arquivo que não é imagem nunca chega ao disco
+    try:
+        with Image.open(BytesIO(dados)) as img:
+            img.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as erro:
+        raise ValueError("O arquivo enviado não é uma imagem válida.") from erro
+
+@medido('Foto: gravar original')
+def salvar_foto(dados):
+    # grava o original e devolve o foto_path (versão de exibição) sem esperar o redimensionamento;
+    # ValueError se o conteúdo não for uma imagem
+    digest = hashlib.sha256(dados).hexdigest()
+    caminhos = _caminhos(digest)
+    os.makedirs(PASTA_ORIGINAIS, exist_ok=True)
+    if not os.path.exists(caminhos['original']):
+        _validar_imagem(dados)
+        gravar(caminhos['original'], dados)
+    if not (os.path.exists(caminhos['exibicao']) and os.path.exists(caminhos['miniatura'])):
+        _agendar(digest, processar_foto, digest)
+    return caminhos['exibicao']
+
+def caminho_foto(foto_path, tamanho='exibicao'):
+    # melhor arquivo disponível para o tamanho pedido ('miniatura', 'exibicao' ou 'original');
+    # enquanto as versões reduzidas não ficam prontas, usa o original
+    digest = _digest(foto_path)
+    if digest is None:
+        return foto_path if foto_path and os.path.exists(foto_path) else None
+    caminhos = _caminhos(digest)
+    for opcao in (tamanho, 'exibicao', 'original'):
+        if os.path.exists(caminhos[opcao]):
+            return caminhos[opcao]
+    return None
+
+def preparar_foto(foto_path, tamanho='exibicao'):
+    # para quem já roda fora da sessão (PDF): gera as versões reduzidas se ainda faltarem
+    digest = _digest(foto_path)
+    if digest is not None and os.path.exists(_caminhos(digest)['original']):
+        processar_foto(digest)
+    return caminho_foto(foto_path, tamanho)
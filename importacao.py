@@ -0,0 +1,45 @@
+# importacao.py - FSJ LAVAGENS: IMPORTAÇÃO CSV
+# Lê o arquivo enviado (UTF-8 ou Latin-1, separado por vírgula ou ponto e vírgula)
+# e entrega as linhas para os importadores em lote do db.py.
+import io
+import csv
+import unicodedata
+import pandas as pd
+import db
+
+IMPORTADORES = {
+    'veiculos': db.importar_veiculos,
+    'fornecedores': db.importar_fornecedores,
+    'precos': db.importar_precos,
+}
+
+# COLUNAS ESPERADAS EM CADA ARQUIVO (mostradas na tela)
+COLUNAS_CSV = {
+    'veiculos': "placa, tipo, modelo_marca",
+    'fornecedores': "lavador, cnpj, endereco",
+    'precos': "cnpj (ou lavador), tipo_veiculo, servico, valor",
+}
+
+def _texto(dados):
+    try:
+        return dados.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return dados.decode('latin-1')  # CSV salvo pelo Excel em português
+
+def _coluna(nome):
+    # "Serviço" -> "servico", "Modelo/Marca" -> "modelo_marca"
+    nome = unicodedata.normalize('NFKD', nome or "").encode('ascii', 'ignore').decode('ascii')
+    return '_'.join(nome.lower().replace('/', ' ').split())
+
+def ler_csv(dados):
+    texto = _texto(dados)
+    primeira = texto.split('\n', 1)[0]
+    separador = ';' if primeira.count(';') > primeira.count(',') else ','
+    leitor = csv.reader(io.StringIO(texto, newline=''), delimiter=separador)
+    cabecalho = [_coluna(c) for c in next(leitor, [])]
+    return [dict(zip(cabecalho, linha)) for linha in leitor]
+
+def importar_csv(tipo, dados):
+    # devolve (quantidade gravada, DataFrame com as linhas rejeitadas)
+    gravadas, erros = IMPORTADORES[tipo](ler_csv(dados))
+    return gravadas, pd.DataFrame(erros, columns=['Linha', 'Erro'])
@@ -0,0 +1,245 @@
+# pdf_ordem.py - FSJ LAVAGENS: PDF DA ORDEM DE LAVAGEM
+# Geração fora da sessão do operador (pool de threads) e armazenamento em disco
+# por numero_ordem; o arquivo só é refeito quando os dados da ordem mudam.
+import os
+import sys
+import glob
+import json
+import hashlib
+import zipfile
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from io import BytesIO
+from pypdf import PdfWriter
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import cm
+from reportlab.graphics.shapes import Drawing
+from reportlab.graphics.barcode.qr import QrCodeWidget
+import db
+import fotos
+from arquivos import gravar, agendador_unico
+from desempenho import medido
+
+PASTA_PDFS = os.environ.get('FSJ_PASTA_PDFS', os.path.join('static', 'pdfs'))
+URL_ORDEM = os.environ.get('FSJ_URL_ORDEM', 'https://seusite.com/ordem/')
+VERSAO_LAYOUT = 3  # incrementar ao mudar o layout para invalidar os PDFs salvos
+
+# ESTILOS (montados uma vez por processo)
+_ESTILOS = getSampleStyleSheet()
+_ESTILO_CELULA = _ESTILOS['Normal']
+_ESTILO_CELULA_TOPO = ParagraphStyle('CelulaTopo', parent=_ESTILO_CELULA, textColor=colors.white)
+_ESTILO_RODAPE = ParagraphStyle('Rodape', parent=_ESTILO_CELULA, alignment=1)
+_ESTILO_TABELA = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1565c0')),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('BACKGROUND', (0,1), (-1,-1), colors.HexColor('#f8f9fa')),
+])
+
+# CAMPOS DA ORDEM QUE APARECEM NO PDF
+CAMPOS_PDF = ['numero_ordem', 'data', 'placa', 'tipo_veiculo', 'lavador', 'servico', 'valor',
+              'motorista', 'frota', 'px', 'status', 'foto_path']
+
+def _sim_nao(valor):
+    return 'Sim' if valor else 'Não'
+
+def _data_br(data):
+    return f"{data[8:10]}/{data[5:7]}/{data[:4]}" if data and len(data) >= 10 else (data or "-")
+
+def _historia(ordem):
+    story = []
+    story.append(Paragraph("<font size=18><b>ORDEM DE LAVAGEM</b></font>", _ESTILOS['Title']))
+    story.append(Spacer(1, 0.5*cm))
+
+    valor = ordem.get('valor')
+    linhas = [
+        ["Nº Ordem:", ordem['numero_ordem']],
+        ["Data:", _data_br(ordem.get('data'))],
+        ["Placa(s):", ordem.get('placa') or "-"],
+        ["Tipo:", ordem.get('tipo_veiculo') or "-"],
+        ["Lavador:", ordem.get('lavador') or "-"],
+        ["Serviço:", ordem.get('servico') or "-"],
+        ["Valor:", f"R$ {valor:.2f}" if valor is not None else "-"],
+        ["Motorista:", ordem.get('motorista') or "Não informado"],
+        ["Frota/PX:", f"FROTA: {_sim_nao(ordem.get('frota'))} | PX: {_sim_nao(ordem.get('px'))}"],
+        ["Status:", ordem.get('status') or "Pendente"],
+    ]
+    data = [[Paragraph(f"<b>{rotulo}</b>", _ESTILO_CELULA_TOPO if i == 0 else _ESTILO_CELULA), conteudo]
+            for i, (rotulo, conteudo) in enumerate(linhas)]
+    table = Table(data, colWidths=[3*cm, 10*cm])
+    table.setStyle(_ESTILO_TABELA)
+    story.append(table)
+    story.append(Spacer(1, 0.5*cm))
+
+    foto = fotos.preparar_foto(ordem.get('foto_path'))
+    if foto:
+        img = Image(foto, width=12*cm, height=8*cm, kind='proportional')
+        img.hAlign = 'CENTER'
+        story.append(img)
+        story.append(Spacer(1, 0.3*cm))
+
+    story.append(qr_ordem(ordem['numero_ordem']))
+    story.append(Paragraph("<i>Escaneie para acompanhar</i>", _ESTILO_RODAPE))
+    return story
+
+# QR CODE VETORIAL: desenhado direto no PDF; um Drawing novo por documento
+# (o doc.build altera o flowable, e cada ordem é renderizada ~uma vez)
+def qr_ordem(numero_ordem):
+    widget = QrCodeWidget(f"{URL_ORDEM}{numero_ordem}", barWidth=3*cm, barHeight=3*cm, barBorder=2)
+    desenho = Drawing(3*cm, 3*cm)
+    desenho.add(widget.draw())
+    desenho.hAlign = 'CENTER'
+    return desenho
+
+@medido('PDF da ordem')
+def gerar_pdf_ordem(ordem):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*cm)
+    doc.build(_historia(ordem))
+    return buffer.getvalue()
+
+# ARMAZENAMENTO: static/pdfs/<numero_ordem>-<impressão digital>.pdf
+def impressao_digital(ordem):
+    dados = {campo: ordem.get(campo) for campo in CAMPOS_PDF}
+    dados['_layout'] = VERSAO_LAYOUT
+    dados['_url'] = URL_ORDEM
+    foto = fotos.preparar_foto(ordem.get('foto_path'))
+    if foto:
+        dados['_foto'] = (foto, os.path.getmtime(foto))
+    return hashlib.sha1(json.dumps(dados, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+def caminho_pdf(numero_ordem, digital):
+    return os.path.join(PASTA_PDFS, f"{numero_ordem}-{digital}.pdf")
+
+def salvar_pdf_ordem(ordem):
+    numero = ordem['numero_ordem']
+    caminho = caminho_pdf(numero, impressao_digital(ordem))
+    if os.path.exists(caminho):
+        return caminho
+    os.makedirs(PASTA_PDFS, exist_ok=True)
+    gravar(caminho, gerar_pdf_ordem(ordem))
+    # remove versões anteriores da mesma ordem
+    for antigo in glob.glob(os.path.join(PASTA_PDFS, f"{glob.escape(numero)}-*.pdf")):
+        if antigo != caminho:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+    return caminho
+
+def obter_pdf_ordem(numero_ordem):
+    ordem = db.obter_lavagem(numero_ordem)
+    if ordem is None:
+        return None
+    return salvar_pdf_ordem(ordem)
+
+# GERAÇÃO EM SEGUNDO PLANO
+_agendar = agendador_unico('pdf_ordem')
+
+def agendar_pdf_ordem(numero_ordem):
+    return _agendar(numero_ordem, obter_pdf_ordem, numero_ordem)
+
+def ler_pdf_ordem(numero_ordem):
+    # usado como data= (callable) do st.download_button: espera o PDF ficar pronto
+    caminho = agendar_pdf_ordem(numero_ordem).result()
+    if caminho is None:
+        return b""
+    with open(caminho, 'rb') as f:
+        return f.read()
+
+# EXPORTAÇÃO EM LOTE: roda num processo próprio (exportacao_pdf.py), que sobe o pool;
+# o spawn dos processos do pool parte desse script, nunca do app.py do Streamlit.
+# Cada processo do pool renderiza um bloco de ordens direto para o armazenamento
+# em disco; o processo de exportação só junta os arquivos prontos
+ORDENS_POR_TAREFA = 20
+TAREFAS_POR_PROCESSO = 2  # blocos enviados ao pool e ainda não concluídos, por processo
+LIMITE_PDF_UNICO = 200  # o PDF único é montado em memória; acima disso, só ZIP
+SCRIPT_EXPORTACAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exportacao_pdf.py')
+
+def _renderizar_bloco(ordens, pasta_pdfs):
+    global PASTA_PDFS
+    PASTA_PDFS = pasta_pdfs
+    return [(ordem['numero_ordem'], salvar_pdf_ordem(ordem)) for ordem in ordens]
+
+def _blocos(ordens, tamanho):
+    bloco = []
+    for ordem in ordens:
+        bloco.append(ordem)
+        if len(bloco) == tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+def gerar_exportacao(filtros, formato, caminho, processos=None, progresso=None):
+    # chamado dentro do processo de exportação; grava o ZIP/PDF em caminho
+    processos = processos or os.cpu_count()
+    total = db.contar_lavagens(**filtros)
+    prontos = {}
+    ordem_numeros = []
+    feitos = 0
+
+    def colher(concluidos):
+        nonlocal feitos
+        for futuro in concluidos:
+            for numero, caminho_pdf in futuro.result():
+                prontos[numero] = caminho_pdf
+                feitos += 1
+        if progresso:
+            progresso(feitos, total)
+
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        # poucos blocos em voo: as ordens não ficam todas na fila do pool de uma vez
+        pendentes = set()
+        for bloco in _blocos(db.iterar_lavagens(**filtros), ORDENS_POR_TAREFA):
+            ordem_numeros.extend(o['numero_ordem'] for o in bloco)
+            pendentes.add(pool.submit(_renderizar_bloco, bloco, PASTA_PDFS))
+            if len(pendentes) >= processos * TAREFAS_POR_PROCESSO:
+                concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                colher(concluidos)
+        for futuro in as_completed(pendentes):
+            colher([futuro])
+
+    with open(caminho, 'wb') as saida:
+        if formato == "pdf":
+            writer = PdfWriter()
+            for numero in ordem_numeros:
+                writer.append(prontos[numero])
+            writer.write(saida)
+            writer.close()
+        else:
+            with zipfile.ZipFile(saida, 'w', zipfile.ZIP_STORED) as zf:
+                for numero in ordem_numeros:
+                    zf.write(prontos[numero], arcname=f"{numero}.pdf")
+
+def exportar_pdfs(filtros, formato="zip", progresso=None, processos=None):
+    # formato "zip" (um PDF por ordem) ou "pdf" (um único PDF com todas as ordens);
+    # devolve um arquivo temporário em disco, posicionado no início
+    total = db.contar_lavagens(**filtros)
+    if formato == "pdf" and total > LIMITE_PDF_UNICO:
+        raise ValueError(f"PDF único limitado a {LIMITE_PDF_UNICO} ordens ({total} filtradas). Use o ZIP.")
+    saida = tempfile.NamedTemporaryFile(suffix=f".{formato}")
+    pedido = {'db': db.DB_PATH, 'pasta_pdfs': PASTA_PDFS, 'filtros': filtros, 'formato': formato,
+              'saida': saida.name, 'processos': processos}
+    # o processo de exportação escreve "feitos total" a cada bloco concluído
+    with subprocess.Popen([sys.executable, SCRIPT_EXPORTACAO, json.dumps(pedido, default=str)],
+                          stdout=subprocess.PIPE, text=True) as processo:
+        for linha in processo.stdout:
+            partes = linha.split()
+            if progresso and len(partes) == 2 and all(p.isdigit() for p in partes):
+                progresso(int(partes[0]), int(partes[1]))
+    if processo.returncode != 0:
+        saida.close()
+        raise RuntimeError(f"Exportação de PDFs falhou (código {processo.returncode})")
+    saida.seek(0)
+    return saida
+
+def ler_arquivo(arquivo):
+    arquivo.seek(0)
+    return arquivo.read()